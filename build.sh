@@ -5,8 +5,12 @@ set -o errexit
 # Install dependencies
 pip install -r requirements.txt
 
-# Collect static files
+# Build minified assets, critical CSS and icons, then collect static files
+python manage.py build_assets
 python manage.py collectstatic --no-input
 
 # Run migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Create the cache table (only does anything when CACHE_BACKEND=database)
+python manage.py createcachetable
\ No newline at end of file
@@ -85,6 +85,7 @@ SITE_ID = 1
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'portfolio.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -102,7 +103,9 @@ ROOT_URLCONF = 'photography_config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that records render time in the request metrics
+        'BACKEND': 'portfolio.metrics.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -134,6 +137,50 @@ else:
         }
     }
 
+# Cache - shared between gunicorn workers unless CACHE_BACKEND=locmem, in which
+# case the cache statistics page only shows the worker that served it and
+# /metrics reports per-worker series (labelled worker="<pid>"); use a shared
+# backend in production so every scrape sees the totals of all workers.
+# 'database' needs `python manage.py createcachetable`; 'redis' works with any
+# Redis-protocol server (Redis, Valkey, Memorystore) given as CACHE_LOCATION.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'portfolio'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/tmp/django_cache'),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'da'),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
+    }
+}
+if CACHE_BACKEND in ('locmem', 'file', 'database'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+    }
+
+# Session storage. 'db' reads the session table on every request, 'cached_db'
+# answers reads from the cache and only writes through to the database,
+# 'cache' keeps sessions only in the cache (use a shared, persistent backend;
+# evicted entries log users out) and 'signed_cookies' stores them in the
+# cookie itself, with no server-side storage at all.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_BACKEND not in SESSION_ENGINES:
+    raise ValueError(f"SESSION_BACKEND must be one of {', '.join(SESSION_ENGINES)}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+
 # Authentication backends
 AUTHENTICATION_BACKENDS = [
     'portfolio.firebase_auth.FirebaseAuthenticationBackend',
@@ -169,8 +216,17 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# WhiteNoise configuration for serving static files in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise serves hashed static files with far-future caching, precompressed
+# with gzip and brotli at collectstatic. Run `manage.py build_assets` first to
+# build minified files, critical CSS and icons into static/dist/.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Cloudinary configuration
 import cloudinary
@@ -199,15 +255,75 @@ FIREBASE_STORAGE_BUCKET = os.environ.get('FIREBASE_STORAGE_BUCKET', '')
 FIREBASE_MESSAGING_SENDER_ID = os.environ.get('FIREBASE_MESSAGING_SENDER_ID', '')
 FIREBASE_APP_ID = os.environ.get('FIREBASE_APP_ID', '')
 
+# Longest time a verified Firebase ID token is trusted without re-verifying;
+# entries never outlive the token's own expiry
+FIREBASE_TOKEN_CACHE_TIMEOUT = int(os.environ.get('FIREBASE_TOKEN_CACHE_TIMEOUT', '3600'))
+
+# Image derivatives: 'cloudinary' serves Cloudinary transformations, 'local'
+# serves files built by `manage.py generate_derivatives` into the default storage
+IMAGE_DERIVATIVE_BACKEND = os.environ.get('IMAGE_DERIVATIVE_BACKEND', 'cloudinary')
+IMAGE_DERIVATIVE_FORMATS = os.environ.get('IMAGE_DERIVATIVE_FORMATS', 'webp,jpeg').split(',')
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', '80'))
+# Derivative names change whenever the image does, so they can be cached forever
+IMAGE_DERIVATIVE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Class used by `manage.py ingest_photos` to upload originals
+PHOTO_INGEST_UPLOADER = os.environ.get('PHOTO_INGEST_UPLOADER', 'portfolio.ingest.CloudinaryUploader')
+
 # Media files configuration
 if os.environ.get('USE_GCS') == 'True':
-    DEFAULT_FILE_STORAGE = 'storages.backends.gcs.GoogleCloudStorage'
+    # Sets IMAGE_DERIVATIVE_CACHE_CONTROL on derivative files only
+    STORAGES['default'] = {'BACKEND': 'portfolio.storage.MediaStorage'}
     GS_BUCKET_NAME = os.environ.get('GCS_BUCKET_NAME', 'danielahlberg-me-media')
     MEDIA_URL = f'https://storage.googleapis.com/{GS_BUCKET_NAME}/'
 else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Portfolio grid pagination
+PORTFOLIO_PAGE_SIZE = int(os.environ.get('PORTFOLIO_PAGE_SIZE', '24'))
+PORTFOLIO_MAX_PAGE_SIZE = int(os.environ.get('PORTFOLIO_MAX_PAGE_SIZE', '60'))
+
+# Seconds a cached catalog page lives; entries are also invalidated by catalog version
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '3600'))
+
+# Identifies the deploy in page cache keys and ETags of public pages; defaults to
+# Railway's RAILWAY_DEPLOYMENT_ID or Cloud Run's K_REVISION, else the process start
+RELEASE_VERSION = (
+    os.environ.get('RELEASE_VERSION') or os.environ.get('RAILWAY_DEPLOYMENT_ID') or os.environ.get('K_REVISION', '')
+)
+
+# Browser/CDN lifetime of robots.txt, security.txt and search engine verification files
+SEO_FILE_MAX_AGE = int(os.environ.get('SEO_FILE_MAX_AGE', '86400'))
+
+# Seconds pre-rendered sitemaps live; they are also replaced when the catalog version changes
+SITEMAP_CACHE_TIMEOUT = int(os.environ.get('SITEMAP_CACHE_TIMEOUT', '86400'))
+# URLs per sitemap file; above this /sitemap.xml becomes a sitemap index (the protocol allows 50,000)
+SITEMAP_MAX_URLS = int(os.environ.get('SITEMAP_MAX_URLS', '45000'))
+# Image entries listed per category page (search engines read at most 1,000)
+SITEMAP_IMAGES_PER_URL = int(os.environ.get('SITEMAP_IMAGES_PER_URL', '1000'))
+
+# Seconds a signed Google Cloud Storage URL for a gallery download stays valid
+DOWNLOAD_URL_EXPIRY = int(os.environ.get('DOWNLOAD_URL_EXPIRY', '300'))
+
+# Galleries per page on the photographer dashboard
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', '50'))
+
+# Seconds a cached client gallery manifest lives; entries are also invalidated by signals
+GALLERY_CACHE_TIMEOUT = int(os.environ.get('GALLERY_CACHE_TIMEOUT', '3600'))
+# Most photos a client can select or unselect in one request
+GALLERY_MAX_SELECTION_BATCH = int(os.environ.get('GALLERY_MAX_SELECTION_BATCH', '2000'))
+
+# Full-page cache for anonymous visitors to the public pages
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', '600'))
+# Longest time a request waits for another request to render the same page
+PAGE_CACHE_LOCK_TIMEOUT = int(os.environ.get('PAGE_CACHE_LOCK_TIMEOUT', '10'))
+
+# Bearer token Prometheus sends to scrape /metrics; without it only staff can read them
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Requests slower than this are logged with their SQL and template time (0 disables)
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', '1000'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,19 +1,13 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib.sitemaps.views import sitemap
-from portfolio.sitemaps import StaticViewSitemap, CategorySitemap, PhotoSitemap
-
-sitemaps = {
-    'static': StaticViewSitemap,
-    'categories': CategorySitemap,
-    'photos': PhotoSitemap,
-}
+from portfolio import views_seo
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', views_seo.sitemap, name='django.contrib.sitemaps.views.sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+-\d+\.xml)$', views_seo.sitemap, name='sitemap_section'),
     path('', include('portfolio.urls')),
 ]
 
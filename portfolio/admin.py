@@ -1,7 +1,43 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from .galleries import photo_count_subquery
 from .models import Category, Photo, ClientProfile, Gallery, ContactMessage
 
+# Above this many rows an unfiltered changelist shows the planner's estimate
+# instead of running COUNT(*) over the whole table
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids exact counts of large, unfiltered tables.
+
+    On PostgreSQL the row count of an unfiltered changelist comes from the
+    table statistics (pg_class.reltuples), which is instant but approximate.
+    Filtered lists, small tables and other databases use an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                        [queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                    return row[0]
+        return super().count
+
 
 # Custom Admin Site
 class CustomAdminSite(admin.AdminSite):
@@ -25,9 +61,13 @@ class CategoryAdmin(admin.ModelAdmin):
     list_editable = ['order']
     prepopulated_fields = {'slug': ('name',)}
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(photo_count=Count('photos'))
+
     def photo_count(self, obj):
-        return obj.photos.count()
+        return obj.photo_count
     photo_count.short_description = 'Photos'
+    photo_count.admin_order_field = 'photo_count'
 
 
 @admin.register(Photo)
@@ -35,12 +75,19 @@ class PhotoAdmin(admin.ModelAdmin):
     list_display = ['title', 'category', 'location', 'date_taken', 'is_hero', 'is_featured', 'is_public', 'image_preview']
     list_filter = ['category', 'is_hero', 'is_featured', 'is_public', 'date_taken']
     list_editable = ['is_hero', 'is_featured', 'is_public']
-    search_fields = ['title', 'description', 'location']
+    search_fields = ['title', 'description', 'location', 'camera', 'lens']
     date_hierarchy = 'date_uploaded'
+    readonly_fields = ['width', 'height', 'orientation']
+    list_select_related = ['category']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', obj.get_thumbnail_url())
+            return format_html(
+                '<img src="{}" width="50" height="50" loading="lazy" decoding="async" style="object-fit: cover;" />',
+                obj.get_preset_url('admin_preview'),
+            )
         return "No image"
     image_preview.short_description = 'Preview'
 
@@ -50,23 +97,33 @@ class ClientProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'session_type', 'session_date', 'phone', 'is_active', 'gallery_count']
     list_filter = ['session_type', 'session_date', 'is_active']
     search_fields = ['user__first_name', 'user__last_name', 'user__email', 'phone']
+    list_select_related = ['user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(gallery_count=Count('galleries'))
 
     def gallery_count(self, obj):
-        return obj.galleries.count()
+        return obj.gallery_count
     gallery_count.short_description = 'Galleries'
+    gallery_count.admin_order_field = 'gallery_count'
 
 
 @admin.register(Gallery)
 class GalleryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'client', 'photo_count', 'created_date', 'is_active', 'password_protected']
+    list_display = ['name', 'client', 'photo_count', 'selected_count', 'created_date', 'is_active', 'password_protected']
     list_filter = ['is_active', 'password_protected', 'created_date']
     search_fields = ['name', 'client__user__first_name', 'client__user__last_name']
     prepopulated_fields = {'slug': ('name',)}
     filter_horizontal = ['photos']
+    list_select_related = ['client__user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(photo_count=photo_count_subquery())
 
     def photo_count(self, obj):
-        return obj.photos.count()
+        return obj.photo_count
     photo_count.short_description = 'Photos'
+    photo_count.admin_order_field = 'photo_count'
 
 
 @admin.register(ContactMessage)
@@ -76,6 +133,8 @@ class ContactMessageAdmin(admin.ModelAdmin):
     search_fields = ['name', 'email', 'message']
     readonly_fields = ['created_date']
     actions = ['mark_as_read', 'mark_as_unread']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def mark_as_read(self, request, queryset):
         queryset.update(is_read=True)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class PortfolioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'portfolio'
\ No newline at end of file
+    name = 'portfolio'
+
+    def ready(self):
+        from . import signals  # noqa: F401
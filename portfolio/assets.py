@@ -0,0 +1,277 @@
+"""
+Static asset build step used by `manage.py build_assets`.
+
+Minified stylesheets and scripts, critical CSS for above-the-fold content
+and right-sized icon variants are written to static/dist/ together with
+dist/assets.json, which maps each source file to its built versions. The
+portfolio_assets template tags read that map and fall back to the source
+files when nothing has been built, e.g. in development.
+
+Hashed file names and gzip/brotli precompression are added afterwards by
+collectstatic (CompressedManifestStaticFilesStorage).
+"""
+import json
+import os
+import re
+from io import BytesIO
+
+import rcssmin
+import rjsmin
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from PIL import Image
+
+DIST_DIR = 'dist'
+ASSET_MAP = f'{DIST_DIR}/assets.json'
+
+# Files minified into dist/
+MINIFIED_ASSETS = ['css/style.css', 'js/firebase-auth.js']
+
+# Icon variants: name -> (source, square size in px, background or None for transparent)
+ICON_VARIANTS = {
+    'favicon-32': ('images/logo.png', 32, None),
+    'favicon-192': ('images/logo.png', 192, None),
+    'apple-touch-icon': ('images/logo.png', 180, (255, 255, 255)),
+}
+
+# Critical CSS per page: stylesheet, and the template slices (template, start,
+# end marker) whose markup is visible before scrolling
+CRITICAL_PAGES = {
+    'home': {
+        'stylesheet': 'css/style.css',
+        'markup': [
+            ('base.html', '<body', '{% block content %}'),
+            ('portfolio/home.html', '{% block body_class %}', '{% endblock %}'),
+            ('portfolio/home.html', '{% block content %}', '</section>'),
+        ],
+    },
+}
+
+# Always kept in critical CSS: they style the page before any element does
+CRITICAL_ALWAYS = {':root', 'html', 'body', '*'}
+
+# Loaded on first use; the built files only change with a deploy
+_asset_map = {}
+
+
+def source_path(name):
+    """Absolute path of a file in STATICFILES_DIRS."""
+    path = finders.find(name)
+    if not path:
+        raise FileNotFoundError(f"Static file {name} not found")
+    return path
+
+
+def dist_root():
+    return os.path.join(settings.STATICFILES_DIRS[0], DIST_DIR)
+
+
+def write_dist(name, content):
+    """Write a built file to static/dist/ and return its static name."""
+    path = os.path.join(dist_root(), *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(path, mode, **({} if mode == 'wb' else {'encoding': 'utf-8'})) as f:
+        f.write(content)
+    return f'{DIST_DIR}/{name}'
+
+
+def minify(name):
+    """
+    Minify a stylesheet or script.
+
+    Returns:
+        Minified text
+    """
+    with open(source_path(name), encoding='utf-8') as f:
+        content = f.read()
+    if name.endswith('.css'):
+        return rcssmin.cssmin(content)
+    return rjsmin.jsmin(content)
+
+
+def minified_name(name):
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.min{extension}'
+
+
+def render_icon(name, size, background=None):
+    """
+    Scale an image into a square icon, centred and padded.
+
+    Returns:
+        PNG bytes
+    """
+    with Image.open(source_path(name)) as image:
+        image = image.convert('RGBA')
+        image.thumbnail((size, size), Image.LANCZOS)
+        canvas = Image.new('RGBA', (size, size), (*background, 255) if background else (0, 0, 0, 0))
+        canvas.alpha_composite(image, ((size - image.width) // 2, (size - image.height) // 2))
+        if background:
+            canvas = canvas.convert('RGB')
+        output = BytesIO()
+        canvas.save(output, 'PNG', optimize=True)
+        return output.getvalue()
+
+
+def _template_source(template_name):
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        path = os.path.join(directory, template_name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+    raise FileNotFoundError(f"Template {template_name} not found")
+
+
+def markup_tokens(slices):
+    """
+    Collect the words and tag names used in template slices.
+
+    Every word is treated as a potential class or id, which errs on the side
+    of keeping rules.
+
+    Returns:
+        Tuple of (set of words, set of tag names)
+    """
+    words, tags = set(), set()
+    for template_name, start, end in slices:
+        source = _template_source(template_name)
+        begin = source.index(start)
+        markup = source[begin:source.index(end, begin + len(start))]
+        words.update(re.findall(r'[\w-]+', markup))
+        tags.update(tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', markup))
+    return words, tags
+
+
+def _selector_matches(selector, words, tags):
+    selector = selector.strip()
+    if selector in CRITICAL_ALWAYS:
+        return True
+    # Pseudo-classes and attribute selectors do not decide whether an element exists
+    simplified = re.sub(r'::?[\w-]+(\([^)]*\))?|\[[^\]]*\]', '', selector)
+    for compound in re.split(r'[\s>+~]+', simplified):
+        if not compound:
+            continue
+        tag = re.match(r'[a-zA-Z][\w-]*', compound)
+        if tag and tag.group().lower() not in tags | CRITICAL_ALWAYS:
+            return False
+        if any(name not in words for name in re.findall(r'[.#]([\w-]+)', compound)):
+            return False
+    return True
+
+
+def _split_rules(css):
+    """Split CSS into (prelude, body) pairs; body is None for statements like @charset."""
+    rules = []
+    position = 0
+    while position < len(css):
+        brace = css.find('{', position)
+        semicolon = css.find(';', position)
+        if brace == -1:
+            break
+        if semicolon != -1 and semicolon < brace and css[position:semicolon].lstrip().startswith('@'):
+            rules.append((css[position:semicolon].strip(), None))
+            position = semicolon + 1
+            continue
+        depth, end = 0, brace
+        while end < len(css):
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            end += 1
+        rules.append((css[position:brace].strip(), css[brace + 1:end]))
+        position = end + 1
+    return rules
+
+
+def critical_css(css, words, tags):
+    """
+    Keep the rules of a stylesheet that can apply to the given markup.
+
+    Media queries are filtered recursively; keyframes are kept when a kept
+    rule uses them.
+
+    Returns:
+        Minified CSS
+    """
+    keyframes = {}
+
+    def select(css):
+        kept = []
+        for prelude, body in _split_rules(css):
+            if body is None:
+                if prelude.startswith('@charset'):
+                    kept.append(f'{prelude};')
+            elif prelude.startswith(('@media', '@supports')):
+                inner = select(body)
+                if inner:
+                    kept.append(f'{prelude}{{{inner}}}')
+            elif re.match(r'@(-\w+-)?keyframes', prelude):
+                keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+            elif prelude.startswith('@font-face'):
+                kept.append(f'{prelude}{{{body}}}')
+            elif not prelude.startswith('@') and any(_selector_matches(s, words, tags) for s in prelude.split(',')):
+                kept.append(f'{prelude}{{{body}}}')
+        return ''.join(kept)
+
+    selected = select(rcssmin.cssmin(css))
+    used = [rule for name, rule in keyframes.items() if re.search(rf'\b{re.escape(name)}\b', selected)]
+    return selected + ''.join(used)
+
+
+def build_assets():
+    """
+    Build every asset and write dist/assets.json.
+
+    Returns:
+        The asset map: {'files': {source or source@variant: built name},
+        'critical': {page: built name}}
+    """
+    asset_map = {'files': {}, 'critical': {}}
+
+    for name in MINIFIED_ASSETS:
+        asset_map['files'][name] = write_dist(minified_name(name), minify(name))
+
+    for variant, (name, size, background) in ICON_VARIANTS.items():
+        built = f"{os.path.dirname(name)}/{variant}.png"
+        asset_map['files'][f'{name}@{variant}'] = write_dist(built, render_icon(name, size, background))
+
+    for page, spec in CRITICAL_PAGES.items():
+        with open(source_path(spec['stylesheet']), encoding='utf-8') as f:
+            css = f.read()
+        words, tags = markup_tokens(spec['markup'])
+        asset_map['critical'][page] = write_dist(f'critical/{page}.css', critical_css(css, words, tags))
+
+    write_dist('assets.json', json.dumps(asset_map, indent=2, sort_keys=True))
+    _asset_map.clear()
+    return asset_map
+
+
+def get_asset_map():
+    """Return the built asset map, read once per process; empty if not built."""
+    if 'map' not in _asset_map:
+        asset_map = {}
+        path = finders.find(ASSET_MAP)
+        if path:
+            with open(path, encoding='utf-8') as f:
+                asset_map = json.load(f)
+        _asset_map.update(map=asset_map, critical={})
+    return _asset_map['map']
+
+
+def get_critical_css(page):
+    """Return the critical CSS built for a page, or '' if there is none."""
+    name = get_asset_map().get('critical', {}).get(page)
+    if not name:
+        return ''
+    cached = _asset_map['critical']
+    if page not in cached:
+        path = finders.find(name)
+        if not path:
+            return ''
+        with open(path, encoding='utf-8') as f:
+            cached[page] = f.read()
+    return cached[page]
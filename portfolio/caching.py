@@ -0,0 +1,273 @@
+"""
+Namespaced, versioned access to the shared cache, with hit/miss statistics.
+
+Every kind of cached portfolio data lives in a CacheNamespace. Keys embed
+the namespace name and a version number stored in the cache itself, so a
+whole namespace is invalidated by bumping its version; the old entries
+simply age out. Hits and misses are counted in-process and periodically
+added to counters in the shared cache, so the stats page aggregates every
+gunicorn worker. The local-memory cache is private to each process, so with
+it the counters are kept in a plain dict instead, where culling cannot drop
+them, and the stats page says they cover one worker.
+"""
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+STATS_PREFIX = 'cachestats'
+
+# Flush in-process counters to the shared cache after this many lookups or seconds
+STATS_FLUSH_EVERY = 100
+STATS_FLUSH_SECONDS = 10
+
+_namespaces = {}
+_stats_lock = threading.Lock()
+_pending_stats = {}
+_pending_count = 0
+_last_flush = time.monotonic()
+# Counters of this process when the cache is not shared between workers
+_counter_lock = threading.Lock()
+_local_counters = {}
+
+
+class CacheNamespace:
+    """
+    A group of related cache entries sharing one version number.
+
+    Args:
+        name: namespace name, used as the key prefix
+        version_key: cache key holding the version; namespaces that must be
+            invalidated together can share one
+        timeout: default timeout in seconds for set()
+    """
+
+    def __init__(self, name, version_key=None, timeout=None):
+        self.name = name
+        self.version_key = version_key or f"{name}:version"
+        self.timeout = timeout
+        _namespaces[name] = self
+
+    def __repr__(self):
+        return f"<CacheNamespace {self.name}>"
+
+    def version(self):
+        """Return the current version, seeding it if the cache is cold."""
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, int(time.time()), None)
+            version = cache.get(self.version_key, 0)
+        return version
+
+    def bump(self):
+        """Invalidate every entry in the namespace by moving to a new version."""
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            # Key was evicted; reseed with a timestamp so old versions are not reused
+            version = int(time.time())
+            cache.set(self.version_key, version, None)
+            return version
+
+    def key(self, *parts):
+        """Build a cache key scoped to this namespace and its current version."""
+        return ':'.join([self.name, str(self.version())] + [str(part) for part in parts])
+
+    def get(self, key, default=None):
+        value = cache.get(key)
+        record_lookup(self.name, value is not None)
+        return default if value is None else value
+
+    def set(self, key, value, timeout=None):
+        cache.set(key, value, timeout if timeout is not None else self.timeout)
+
+    def add(self, key, value, timeout=None):
+        return cache.add(key, value, timeout if timeout is not None else self.timeout)
+
+    def delete(self, key):
+        cache.delete(key)
+
+    def get_or_set(self, key, default, timeout=None):
+        """Return the cached value, computing and storing it with default() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = default()
+            self.set(key, value, timeout)
+        return value
+
+
+def namespaces():
+    """All registered namespaces, by name."""
+    return dict(_namespaces)
+
+
+def record_lookup(name, hit):
+    """Count a cache hit or miss for a namespace."""
+    global _pending_count
+    with _stats_lock:
+        counts = _pending_stats.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+        _pending_count += 1
+        due = (
+            _pending_count >= STATS_FLUSH_EVERY or
+            time.monotonic() - _last_flush >= STATS_FLUSH_SECONDS
+        )
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add the in-process hit/miss counters to the shared counters."""
+    global _pending_stats, _pending_count, _last_flush
+    with _stats_lock:
+        pending, _pending_stats = _pending_stats, {}
+        _pending_count = 0
+        _last_flush = time.monotonic()
+
+    for name, (hits, misses) in pending.items():
+        for kind, delta in (('hits', hits), ('misses', misses)):
+            if not delta:
+                continue
+            incr_counter(f"{STATS_PREFIX}:{name}:{kind}", delta)
+
+
+def shared_cache():
+    """Whether every worker process sees the same cache; the local-memory cache is per process."""
+    return settings.CACHE_BACKEND != 'locmem'
+
+
+def incr_counter(key, delta):
+    """Add to a counter in the shared cache, creating it (without expiry) if needed."""
+    if not shared_cache():
+        with _counter_lock:
+            _local_counters[key] = _local_counters.get(key, 0) + delta
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def get_counters(keys):
+    """
+    Read counters written by incr_counter().
+
+    Returns:
+        Dict mapping each key to its value, 0 if it was never incremented
+    """
+    if not shared_cache():
+        with _counter_lock:
+            return {key: _local_counters.get(key, 0) for key in keys}
+    values = cache.get_many(keys)
+    return {key: values.get(key, 0) for key in keys}
+
+
+def delete_counters(keys):
+    """Remove counters written by incr_counter()."""
+    if not shared_cache():
+        with _counter_lock:
+            for key in keys:
+                _local_counters.pop(key, None)
+        return
+    cache.delete_many(keys)
+
+
+def reset_stats():
+    """Clear the shared hit/miss counters."""
+    flush_stats()
+    delete_counters([
+        f"{STATS_PREFIX}:{name}:{kind}" for name in _namespaces for kind in ('hits', 'misses')
+    ])
+
+
+def display_location():
+    """
+    The cache location without credentials, safe to show on the stats page.
+
+    URLs such as redis://:password@host:6379/0 lose their user info; other
+    locations (paths, table names) are returned unchanged.
+    """
+    location = settings.CACHES['default'].get('LOCATION', '')
+    locations = location if isinstance(location, (list, tuple)) else location.split(',')
+    cleaned = []
+    for url in locations:
+        parts = urlsplit(url.strip())
+        if parts.scheme and '@' in parts.netloc:
+            url = urlunsplit(parts._replace(netloc=parts.netloc.rpartition('@')[2]))
+        cleaned.append(url)
+    return ', '.join(cleaned)
+
+
+def _key_usage(name):
+    """
+    Count keys and approximate memory for a namespace.
+
+    Support depends on the backend; returns (None, None) when the backend
+    cannot be inspected (e.g. the file-based cache hashes its keys).
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    prefix = cache.make_key(f"{name}:")
+
+    if backend.endswith('locmem.LocMemCache'):
+        with cache._lock:
+            items = [(k, v) for k, v in cache._cache.items() if k.startswith(prefix)]
+        return len(items), sum(len(k) + len(v) for k, v in items)
+
+    if backend.endswith('redis.RedisCache'):
+        client = cache._cache.get_client(None, write=False)
+        count = memory = 0
+        for key in client.scan_iter(match=f"{prefix}*", count=1000):
+            count += 1
+            memory += client.memory_usage(key) or 0
+        return count, memory
+
+    if backend.endswith('db.DatabaseCache'):
+        from django.db import connections, router
+        db = router.db_for_read(cache.cache_model_class)
+        table = connections[db].ops.quote_name(cache._table)
+        # Range scan on the primary key: every key that starts with the prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with connections[db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM {table} "
+                f"WHERE cache_key >= %s AND cache_key < %s",
+                [prefix, upper],
+            )
+            count, memory = cursor.fetchone()
+        return count, memory
+
+    return None, None
+
+
+def collect_stats():
+    """
+    Gather statistics for every registered namespace.
+
+    Returns:
+        List of dicts with name, version, hits, misses, hit_ratio, keys and bytes
+    """
+    flush_stats()
+    counters = get_counters([
+        f"{STATS_PREFIX}:{name}:{kind}" for name in _namespaces for kind in ('hits', 'misses')
+    ])
+    rows = []
+    for name, namespace in sorted(_namespaces.items()):
+        hits = counters[f"{STATS_PREFIX}:{name}:hits"]
+        misses = counters[f"{STATS_PREFIX}:{name}:misses"]
+        try:
+            keys, memory = _key_usage(name)
+        except Exception:
+            keys, memory = None, None
+        rows.append({
+            'name': name,
+            'version': namespace.version(),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else None,
+            'keys': keys,
+            'bytes': memory,
+        })
+    return rows
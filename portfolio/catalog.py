@@ -0,0 +1,127 @@
+"""
+Cached access to the public photo catalog.
+
+Cache keys embed a global catalog version which is bumped whenever a Photo
+or Category changes (see signals.py), so stale pages are never served and
+never need to be deleted explicitly; they simply age out of the cache.
+"""
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from .caching import CacheNamespace
+from .models import Category, Photo
+from .pagination import keyset_page
+
+CATALOG_VERSION_KEY = 'portfolio:catalog_version'
+# Time of the last bump; deletions and bulk updates leave no trace in date_modified
+CATALOG_CHANGED_KEY = 'portfolio:catalog_changed_at'
+
+# Catalog API pages and grid tiles
+catalog_cache = CacheNamespace('catalog', version_key=CATALOG_VERSION_KEY, timeout=settings.CATALOG_CACHE_TIMEOUT)
+# Full public pages; they depend on the same data, so they share the catalog version
+page_cache = CacheNamespace('pages', version_key=CATALOG_VERSION_KEY, timeout=settings.PAGE_CACHE_TIMEOUT)
+
+# Fields the catalog API may return; clients can ask for a subset via ?fields=
+PHOTO_FIELDS = ('id', 'title', 'image_url', 'thumbnail_url', 'placeholder', 'width', 'height', 'category', 'description', 'location')
+
+
+def get_catalog_version():
+    """Return the current catalog version."""
+    return catalog_cache.version()
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry and public page."""
+    cache.set(CATALOG_CHANGED_KEY, datetime.now(timezone.utc).timestamp(), None)
+    return catalog_cache.bump()
+
+
+def get_catalog_stamp():
+    """
+    Return the content version of the public catalog, for HTTP validators.
+
+    Computed with two aggregate queries once per catalog version and cached
+    alongside the catalog.
+
+    Returns:
+        Tuple of (catalog version, aware datetime of the last change to any
+        photo or category)
+    """
+    def build():
+        photos = Photo.objects.aggregate(latest=Max('date_modified'), uploaded=Max('date_uploaded'))
+        categories = Category.objects.aggregate(latest=Max('date_modified'))
+        changes = [
+            value.timestamp() for value in (photos['latest'], photos['uploaded'], categories['latest']) if value
+        ]
+        changes.append(cache.get(CATALOG_CHANGED_KEY, 0))
+        return get_catalog_version(), max(changes)
+
+    version, last_modified = catalog_cache.get_or_set(catalog_cache.key('stamp'), build)
+    return version, datetime.fromtimestamp(last_modified, timezone.utc)
+
+
+def public_photos(category_slug=None):
+    """
+    Public, non-about photos with the category joined in.
+
+    Args:
+        category_slug: optional category slug; 'all' or empty means every category
+
+    Returns:
+        Photo queryset
+    """
+    photos = Photo.objects.filter(is_public=True, is_about_photo=False).select_related('category')
+    if category_slug and category_slug != 'all':
+        photos = photos.filter(category__slug=category_slug)
+    return photos
+
+
+def serialize_photo(photo):
+    """Serialize a photo into the dict shape used by the catalog API."""
+    return {
+        'id': photo.id,
+        'title': photo.title,
+        'image_url': photo.get_preset_url('original'),
+        'thumbnail_url': photo.get_thumbnail_url(),
+        'placeholder': photo.placeholder,
+        'width': photo.width,
+        'height': photo.height,
+        'category': photo.category.slug,
+        'description': photo.description,
+        'location': photo.location,
+    }
+
+
+def get_photo_page(category_slug=None, cursor=None, limit=None):
+    """
+    Return one serialized page of the public catalog, cached per catalog version.
+
+    Args:
+        category_slug: optional category slug
+        cursor: cursor from the previous page, or None for the first page
+        limit: page size (defaults to PORTFOLIO_PAGE_SIZE)
+
+    Returns:
+        Dict with 'photos' (list of dicts) and 'next_cursor'
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    limit = limit or settings.PORTFOLIO_PAGE_SIZE
+    key = catalog_cache.key('photos', category_slug or 'all', cursor or '', limit)
+    page = catalog_cache.get(key)
+    if page is None:
+        photos = public_photos(category_slug).only(
+            'id', 'title', 'image', 'description', 'location', 'date_uploaded',
+            'derivative_urls', 'derivative_source', 'placeholder', 'width', 'height', 'category__slug',
+        )
+        photos, next_cursor = keyset_page(photos, cursor=cursor, limit=limit)
+        page = {
+            'photos': [serialize_photo(photo) for photo in photos],
+            'next_cursor': next_cursor,
+        }
+        catalog_cache.set(key, page)
+    return page
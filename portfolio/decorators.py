@@ -1,11 +1,30 @@
 """
-Custom decorators for Firebase authentication in Django views.
+Custom decorators for Django views: Firebase authentication,
+full-page caching of public pages and precomputed text files.
 """
 from functools import wraps
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth import login
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+from datetime import datetime, timezone
+from .catalog import get_catalog_stamp, page_cache
 from .firebase_auth import verify_firebase_token
+import hashlib
 import json
+import time
+
+# Rendered text files by (view, scheme, host); they only change with a deploy,
+# which restarts the process, so they are never invalidated. Bounded, since
+# ALLOWED_HOSTS may contain wildcards.
+_precomputed_files = {}
+PRECOMPUTED_FILES_MAX = 256
+_process_started = int(time.time())
+# Identifies the running code in page cache keys and ETags. Without a deploy
+# id from the platform, each process start counts as a new release.
+_release = settings.RELEASE_VERSION or f'started-{_process_started}'
 
 
 def firebase_auth_required(view_func):
@@ -43,8 +62,8 @@ def firebase_auth_required(view_func):
                 'error': 'No Firebase ID token provided'
             }, status=401)
 
-        # Verify the token
-        decoded_token = verify_firebase_token(id_token)
+        # Verify the token; the backend reuses this result via the request
+        decoded_token = verify_firebase_token(id_token, request)
         if not decoded_token:
             return JsonResponse({
                 'error': 'Invalid or expired Firebase ID token'
@@ -55,7 +74,11 @@ def firebase_auth_required(view_func):
         user = authenticate(request, firebase_token=id_token)
 
         if user:
-            login(request, user)
+            if auth_header.startswith('Bearer '):
+                # Bearer tokens authenticate each call on their own; no session needed
+                request.user = user
+            elif request.user.pk != user.pk:
+                login(request, user)
             return view_func(request, *args, **kwargs)
         else:
             return JsonResponse({
@@ -63,3 +86,162 @@ def firebase_auth_required(view_func):
             }, status=401)
 
     return wrapper
+
+
+def cache_public_page(view_func):
+    """
+    Decorator that caches the rendered page for anonymous visitors.
+
+    Pages are keyed on the absolute URL path, the ?category= filter, the
+    release and the catalog version, so a deploy never serves pages rendered
+    by older templates from a persistent cache, and editing a Photo or
+    Category invalidates them immediately (see signals.py). Only one request renders a cold page; the
+    others wait briefly for its result instead of rendering it again.
+
+    Requests from logged-in users, requests with pending flash messages and
+    non-GET requests always bypass the cache.
+
+    Usage:
+        @cache_public_page
+        def my_view(request):
+            pass
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _page_cacheable(request):
+            return view_func(request, *args, **kwargs)
+
+        key = page_cache.key(_release, request.build_absolute_uri(request.path), request.GET.get('category', ''))
+        cached = page_cache.get(key)
+        if cached is not None:
+            return _cached_response(cached)
+
+        lock_key = f"{key}:lock"
+        if not page_cache.add(lock_key, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+            # Another request is rendering this page; wait for it to finish
+            deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                cached = page_cache.get(key)
+                if cached is not None:
+                    return _cached_response(cached)
+            return view_func(request, *args, **kwargs)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            # Pages that set cookies or embed a CSRF token are specific to one visitor
+            per_visitor = response.cookies or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            if response.status_code == 200 and not response.streaming and not per_visitor:
+                page_cache.set(key, (response.content, response['Content-Type']))
+        finally:
+            page_cache.delete(lock_key)
+        return response
+
+    return wrapper
+
+
+def catalog_condition(view_func):
+    """
+    Decorator adding catalog-version validators to a public view.
+
+    Anonymous GET requests get a weak ETag built from the catalog version and
+    the release (RELEASE_VERSION, or the process start when no deploy id is
+    known), and a Last-Modified of the latest catalog change or process
+    start, whichever is later; matching conditional requests are answered
+    with 304 before the view runs. Responses carrying the validators are
+    marked Cache-Control: no-cache, so browsers and CDNs revalidate them
+    instead of applying heuristic freshness. Requests that bypass
+    cache_public_page get none of these headers.
+
+    Usage:
+        @catalog_condition
+        @cache_public_page
+        def my_view(request):
+            pass
+    """
+    def stamp(request):
+        if not hasattr(request, '_catalog_stamp'):
+            request._catalog_stamp = get_catalog_stamp() if _page_cacheable(request) else None
+        return request._catalog_stamp
+
+    def etag(request, *args, **kwargs):
+        if stamp(request):
+            version, _ = stamp(request)
+            return f'W/"{version}-{_release}"'
+
+    def last_modified(request, *args, **kwargs):
+        if stamp(request):
+            # Templates change with a deploy, which restarts the process
+            _, changed = stamp(request)
+            return max(changed, datetime.fromtimestamp(_process_started, timezone.utc))
+
+    conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if stamp(request):
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
+
+
+def _page_cacheable(request):
+    """Whether a request may be answered from the shared page cache."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Flash messages are rendered into the page and must not be cached
+    if request.COOKIES.get('messages'):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.session.get('_messages'):
+        return False
+    return True
+
+
+def _cached_response(cached):
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def precomputed_text(content_type):
+    """
+    Decorator for views whose output depends only on settings and the host.
+
+    The decorated function returns the file's text, which must not depend
+    on URL arguments. It is called once per scheme and host; the result is kept in memory and served with a strong
+    ETag, Last-Modified (the process start, i.e. the deploy) and
+    SEO_FILE_MAX_AGE, answering conditional requests with 304.
+
+    Usage:
+        @precomputed_text('text/plain')
+        def my_file(request):
+            return 'content'
+    """
+    def decorator(render):
+        @wraps(render)
+        def wrapper(request, *args, **kwargs):
+            key = (render.__module__, render.__qualname__, request.scheme, request.get_host())
+            entry = _precomputed_files.get(key)
+            if entry is None:
+                content = render(request, *args, **kwargs).encode('utf-8')
+                entry = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+                if len(_precomputed_files) < PRECOMPUTED_FILES_MAX:
+                    _precomputed_files[key] = entry
+            content, etag = entry
+
+            response = get_conditional_response(request, etag=etag, last_modified=_process_started)
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(_process_started)
+            patch_cache_control(response, public=True, max_age=settings.SEO_FILE_MAX_AGE)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,256 @@
+"""
+Local image derivative pipeline.
+
+Resizes photo originals with Pillow into the widths used by
+RESPONSIVE_IMAGE_SLOTS, encodes them as WebP/AVIF/JPEG and stores them in
+the default file storage (MEDIA_ROOT or Google Cloud Storage). This lets
+pages serve right-sized images without relying on Cloudinary
+transformations. It also renders the tiny inline placeholders stored on
+Photo.placeholder.
+
+Rendering is a plain function of the original's bytes, so it can run in a
+ProcessPoolExecutor; storage writes stay in the parent process.
+process_in_pool() runs such functions over many photos for the batch
+management commands.
+"""
+import base64
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .image_urls import RESPONSIVE_IMAGE_SLOTS, image_value
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_ROOT = 'derivatives'
+
+# Pillow format name and content type for each supported output format
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+# Longest edge of the inline placeholder image, in pixels
+PLACEHOLDER_SIZE = 24
+
+DERIVATIVE_WIDTHS = sorted({w for spec in RESPONSIVE_IMAGE_SLOTS.values() for w in spec['widths']})
+
+
+def enabled_formats():
+    """Configured output formats that this Pillow build can encode."""
+    formats = []
+    for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+        if fmt not in FORMATS:
+            logger.warning(f"Unknown derivative format: {fmt}")
+        elif fmt in ('avif', 'webp') and not features.check(fmt):
+            logger.warning(f"Pillow was built without {fmt} support; skipping")
+        else:
+            formats.append(fmt)
+    return formats
+
+
+def derivative_name(value, width, fmt):
+    """
+    Deterministic storage path of one derivative.
+
+    The digest covers the stored image value, which includes the Cloudinary
+    version, so a replaced image never reuses a name and files can be
+    cached forever.
+    """
+    digest = hashlib.sha1(value.encode()).hexdigest()[:12]
+    public_id = value.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    return posixpath.join(DERIVATIVE_ROOT, digest, f"{public_id}-{width}w.{fmt}")
+
+
+def render_variants(original, widths, formats, quality=80):
+    """
+    Resize and encode an original image.
+
+    Runs in worker processes, so it only takes and returns plain data.
+
+    Args:
+        original: bytes of the original image
+        widths: target widths; widths larger than the original are skipped,
+            except that the original width is always produced once
+        formats: keys of FORMATS
+        quality: encoder quality
+
+    Returns:
+        Tuple of (original width, original height, dict mapping
+        (width, format) to encoded bytes)
+    """
+    with Image.open(io.BytesIO(original)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        source_width, source_height = image.size
+
+        targets = [w for w in widths if w < source_width] or [source_width]
+        variants = {}
+        for width in targets:
+            height = round(source_height * width / source_width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                buffer = io.BytesIO()
+                options = {'quality': quality}
+                if fmt == 'jpeg':
+                    options.update(optimize=True, progressive=True)
+                elif fmt == 'webp':
+                    options.update(method=6)
+                resized.save(buffer, FORMATS[fmt][0], **options)
+                variants[(width, fmt)] = buffer.getvalue()
+        return source_width, source_height, variants
+
+
+def fetch_and_render(url, widths, formats, quality=80):
+    """Download an original and render its variants (worker process entry point)."""
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return render_variants(response.content, widths, formats, quality)
+
+
+def original_url(photo):
+    """Full-resolution URL to download a photo's original from."""
+    return photo.get_preset_url('original')
+
+
+def store_variants(value, variants):
+    """
+    Save rendered variants to the default storage under deterministic names.
+
+    Existing files are left untouched, so re-running is cheap.
+
+    Returns:
+        Dict of the form {'source': value, 'widths': {width: {fmt: url}}}
+    """
+    files = {}
+    for (width, fmt), data in sorted(variants.items()):
+        name = derivative_name(value, width, fmt)
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(data))
+        files.setdefault(str(width), {})[fmt] = default_storage.url(name)
+    return {'source': value, 'widths': files}
+
+
+def local_derivatives_current(photo):
+    """Whether a photo's stored local derivatives were built from its current image."""
+    local = (photo.derivative_urls or {}).get('local')
+    return bool(local) and local.get('source') == image_value(photo.image)
+
+
+def build_local_slots(local, primary_format):
+    """
+    Build src/srcset/sizes per layout slot from stored local derivatives.
+
+    Widths missing because the original was smaller fall back to the
+    largest available file.
+    """
+    available = sorted(int(width) for width in local['widths'])
+    slots = {}
+    for slot, spec in RESPONSIVE_IMAGE_SLOTS.items():
+        urls = []
+        for width in spec['widths']:
+            usable = [w for w in available if w <= width] or available[:1]
+            chosen = usable[-1]
+            url = local['widths'][str(chosen)].get(primary_format)
+            if url and (chosen, url) not in urls:
+                urls.append((chosen, url))
+        if not urls:
+            continue
+        slots[slot] = {
+            'src': urls[len(urls) // 2][1],
+            'srcset': ', '.join(f"{url} {width}w" for width, url in urls),
+            'sizes': spec['sizes'],
+        }
+    return slots
+
+
+def render_placeholder(original):
+    """
+    Render a tiny, low-quality JPEG of an image as a data URI.
+
+    Inlined as the background of a tile, it shows the photo's colours while
+    the real image loads (a few hundred bytes per photo).
+
+    Args:
+        original: bytes of the image (any size; small derivatives are fine)
+
+    Returns:
+        data:image/jpeg;base64,... string
+    """
+    with Image.open(io.BytesIO(original)) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=40, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def fetch_placeholder(url):
+    """Download a small derivative and render its placeholder (worker process entry point)."""
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return render_placeholder(response.content)
+
+
+def process_in_pool(photos, task, apply, fields, batch_size, workers, stdout=None, stderr=None, keep_failed=None):
+    """
+    Run a function for many photos in worker processes, saving in batches.
+
+    Each batch is saved with bulk_update as soon as it finishes, so an
+    interrupted run resumes where it stopped.
+
+    Args:
+        photos: list of Photo instances to process
+        task: function(photo) returning (function, *args) to run in a worker;
+            the function and its arguments must be picklable
+        apply: function(photo, result) updating the photo in this process;
+            raising counts the photo as failed
+        fields: Photo fields written by apply (and keep_failed)
+        batch_size: photos processed and saved per batch
+        workers: number of worker processes
+        stdout: optional function(message) for progress
+        stderr: optional function(message) for failures
+        keep_failed: optional function(photo, error) updating a failed photo;
+            when given, failed photos are saved too
+
+    Returns:
+        Tuple of (photos processed successfully, photos that failed)
+    """
+    succeeded = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(photos), batch_size):
+            batch = photos[start:start + batch_size]
+            futures = {executor.submit(*task(photo)): photo for photo in batch}
+
+            done = []
+            for future in as_completed(futures):
+                photo = futures[future]
+                try:
+                    apply(photo, future.result())
+                except Exception as e:
+                    failed += 1
+                    if stderr:
+                        stderr(f'❌ Photo {photo.id}: {e}')
+                    if keep_failed:
+                        keep_failed(photo, e)
+                        done.append(photo)
+                    continue
+                succeeded += 1
+                done.append(photo)
+
+            if done:
+                type(done[0]).objects.bulk_update(done, fields)
+            if stdout:
+                stdout(f'  ...{start + len(batch)}/{len(photos)} processed')
+    return succeeded, failed
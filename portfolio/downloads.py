@@ -0,0 +1,390 @@
+"""
+Streaming ZIP downloads of a gallery's selected photos.
+
+The archive is assembled on the fly: each photo is downloaded in chunks and
+written straight into the response, so memory use does not depend on the
+size of the delivery. Already-compressed images are stored as-is.
+
+The first download of a selection also writes what it streams into the
+default storage, under a name derived from the selection, so the photos are
+fetched once. The copy is written under a temporary name and renamed when
+complete, and a cache lock makes sure only one request copies it. Later
+requests for the same selection (including resumed downloads with a Range
+header) are served from that finished file: directly from local storage, or
+through a short-lived signed URL from Google Cloud Storage.
+"""
+import logging
+import os
+import posixpath
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.crypto import salted_hmac
+from django.utils.text import slugify
+
+from .models import Photo
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_ROOT = 'downloads'
+
+# Archive contents: 'original' is the uploaded file, 'delivery' a high-quality
+# JPEG capped at the size of the 'delivery' preset
+DOWNLOAD_VARIANTS = {
+    'original': 'original',
+    'delivery': 'delivery',
+}
+
+# Formats whose data is already compressed; deflating them only costs CPU
+STORED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp', 'avif', 'heic', 'gif'}
+
+CHUNK_SIZE = 1024 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Longest time one worker may hold the lock for building an archive
+ARCHIVE_BUILD_LOCK_TIMEOUT = 60 * 60
+
+# Archives copied into storage at once per process; each holds an upload buffer
+MAX_ARCHIVE_COPIES = 2
+
+# Completes archive copies (final upload, rename, clean-up) off the request thread
+_finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gallery-archive')
+# Bounds the copies in progress, and with them the finisher's queue
+_copy_slots = threading.BoundedSemaphore(MAX_ARCHIVE_COPIES)
+
+
+class _ZipOutput:
+    """
+    Write-only file object that hands everything written to it to the response.
+
+    It reports its position but cannot seek, so zipfile writes data
+    descriptors instead of going back to patch headers.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.chunks = []
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            self.chunks.append(data)
+            self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def selection_entries(gallery, variant):
+    """
+    List the files that go into a gallery's download.
+
+    Returns:
+        List of (archive member name, source URL) in display order
+    """
+    photos = Photo.objects.filter(selected_in_galleries=gallery).only(
+        'id', 'title', 'image', 'derivative_urls', 'derivative_source', 'date_uploaded',
+    )
+    entries = []
+    for index, photo in enumerate(photos, start=1):
+        if not photo.image:
+            continue
+        url = photo.get_preset_url(DOWNLOAD_VARIANTS[variant])
+        extension = 'jpg' if variant == 'delivery' else (
+            posixpath.splitext(url.split('?')[0])[1].lstrip('.').lower() or 'jpg'
+        )
+        name = f"{index:04d}-{slugify(photo.title) or photo.id}.{extension}"
+        entries.append((name, url))
+    return entries
+
+
+def archive_name(gallery, variant, entries):
+    """
+    Storage name of the finished archive for a selection.
+
+    The name changes whenever the selection or its images change, and it
+    includes a keyed digest, so it cannot be guessed from the gallery id.
+    """
+    digest = salted_hmac(
+        'portfolio.downloads',
+        '\n'.join([variant] + [f"{name} {url}" for name, url in entries]),
+    ).hexdigest()[:24]
+    return f"{DOWNLOAD_ROOT}/gallery-{gallery.id}-{variant}-{digest}.zip"
+
+
+def download_filename(gallery, variant):
+    suffix = '' if variant == 'original' else f'-{variant}'
+    return f"{slugify(gallery.name) or 'gallery'}-selection{suffix}.zip"
+
+
+def stream_archive(entries):
+    """Yield a ZIP archive of the given (member name, URL) entries chunk by chunk."""
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, 'w', allowZip64=True) as archive:
+        for member, url in entries:
+            info = zipfile.ZipInfo(member, date_time=datetime.now().timetuple()[:6])
+            extension = member.rsplit('.', 1)[-1]
+            info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with requests.get(url, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with archive.open(info, 'w', force_zip64=True) as target:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        target.write(chunk)
+                        yield from output.drain()
+            yield from output.drain()
+    # Central directory, written when the archive is closed
+    yield from output.drain()
+
+
+class _ArchiveCopy:
+    """
+    Copy of an archive written to the default storage while it is streamed.
+
+    It is written under a temporary name and renamed once complete, so a
+    half-written archive is never served.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.part = f"{name}.part"
+        try:
+            self.path = default_storage.path(name)
+        except NotImplementedError:
+            self.path = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.target = open(f"{self.path}.part", 'wb')
+        else:
+            self.target = default_storage.open_upload(self.part, content_type='application/zip')
+
+    @staticmethod
+    def supported(name):
+        """Whether the default storage can take an archive written in chunks."""
+        try:
+            default_storage.path(name)
+            return True
+        except NotImplementedError:
+            return hasattr(default_storage, 'open_upload')
+
+    def write(self, chunk):
+        self.target.write(chunk)
+
+    def finish(self):
+        """Complete the copy and publish it under its final name."""
+        self.target.close()
+        if self.path:
+            os.replace(f"{self.path}.part", self.path)
+        else:
+            default_storage.move(self.part, self.name)
+
+    def discard(self):
+        """Remove an incomplete copy."""
+        # Closing always finishes an upload, so a partial one is deleted afterwards
+        self.target.close()
+        if self.path:
+            if os.path.exists(f"{self.path}.part"):
+                os.unlink(f"{self.path}.part")
+        else:
+            default_storage.delete(self.part)
+
+
+def _build_lock_key(name):
+    return f"{DOWNLOAD_ROOT}:build:{name}"
+
+
+def _start_copy(name):
+    """
+    Start copying a streamed archive into the default storage.
+
+    Returns:
+        _ArchiveCopy, or None if another request is already copying it, too
+        many copies are in progress or the storage cannot take streamed writes
+    """
+    if not _ArchiveCopy.supported(name) or not _copy_slots.acquire(blocking=False):
+        return None
+    if not cache.add(_build_lock_key(name), True, ARCHIVE_BUILD_LOCK_TIMEOUT):
+        _copy_slots.release()
+        return None
+    try:
+        return _ArchiveCopy(name)
+    except Exception as e:
+        logger.warning(f"Could not cache gallery download {name}: {e}")
+        _release_copy(name)
+        return None
+
+
+def _release_copy(name):
+    cache.delete(_build_lock_key(name))
+    _copy_slots.release()
+
+
+def _end_copy(copy, completed):
+    """Publish a complete copy or discard an incomplete one; runs on the finisher thread."""
+    try:
+        if completed:
+            copy.finish()
+            _remove_outdated_archives(copy.name)
+        else:
+            copy.discard()
+    except Exception as e:
+        logger.warning(f"Could not cache gallery download {copy.name}: {e}")
+        try:
+            copy.discard()
+        except Exception:
+            pass
+    finally:
+        _release_copy(copy.name)
+        # The thread's own database connections (used by the database cache)
+        connections.close_all()
+
+
+def _stream_response(entries, name):
+    """
+    Stream an archive into a response, copying it into storage on the way.
+
+    The photos are downloaded once, for both. Completing or discarding the
+    copy happens on the finisher thread, so the client does not wait for it.
+    Failures are logged; the client only sees a cut-off download.
+    """
+    copy = _start_copy(name)
+    completed = False
+    try:
+        for chunk in stream_archive(entries):
+            if copy:
+                try:
+                    copy.write(chunk)
+                except Exception as e:
+                    logger.warning(f"Could not cache gallery download {name}: {e}")
+                    _finisher.submit(_end_copy, copy, False)
+                    copy = None
+            yield chunk
+        completed = True
+    except Exception as e:
+        logger.error(f"Gallery download {name} failed: {e}")
+        raise
+    finally:
+        # Also reached when the client disconnects, which discards the copy
+        if copy:
+            _finisher.submit(_end_copy, copy, completed)
+
+
+def _remove_outdated_archives(name):
+    """Delete archives of earlier selections of the same gallery and variant."""
+    gallery_variant = posixpath.basename(name).rsplit('-', 1)[0]
+    pattern = re.compile(rf'^{re.escape(gallery_variant)}-[0-9a-f]+\.zip$')
+    try:
+        _, files = default_storage.listdir(DOWNLOAD_ROOT)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for filename in files:
+        path = f"{DOWNLOAD_ROOT}/{filename}"
+        # Names are derived from the selection, so older archives are never served again
+        if pattern.match(filename) and path != name:
+            default_storage.delete(path)
+
+
+def serve_archive(request, name, filename):
+    """
+    Serve a finished archive, honouring single-range requests.
+
+    On Google Cloud Storage the client is redirected to a signed URL that
+    expires after DOWNLOAD_URL_EXPIRY seconds; GCS handles ranges itself.
+    """
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        if not hasattr(default_storage, 'signed_url'):
+            raise Http404("Archive storage cannot serve downloads")
+        return HttpResponseRedirect(default_storage.signed_url(
+            name,
+            expiration=timedelta(seconds=settings.DOWNLOAD_URL_EXPIRY),
+            response_disposition=f'attachment; filename="{filename}"',
+        ))
+
+    size = os.path.getsize(path)
+    etag = f'"{posixpath.basename(name)[:-4]}"'
+    start, end = 0, size - 1
+    status = 200
+
+    match = RANGE_RE.match(request.headers.get('Range', ''))
+    if_range = request.headers.get('If-Range')
+    if match and (not if_range or if_range == etag) and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        status = 206
+
+    def read_range(remaining):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    length = end - start + 1
+    response = StreamingHttpResponse(read_range(length), status=status, content_type='application/zip')
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-transform'
+    return response
+
+
+def selection_download_response(request, gallery, variant='original'):
+    """
+    Build the response delivering a gallery's selected photos as a ZIP.
+
+    Args:
+        request: the download request
+        gallery: Gallery the client has access to
+        variant: key of DOWNLOAD_VARIANTS
+
+    Returns:
+        HttpResponse (served from the cached archive) or StreamingHttpResponse
+    """
+    entries = selection_entries(gallery, variant)
+    name = archive_name(gallery, variant, entries)
+    filename = download_filename(gallery, variant)
+
+    if default_storage.exists(name):
+        return serve_archive(request, name, filename)
+
+    # Not built yet: stream it now, keeping a copy; ranges are only possible
+    # once the copy exists
+    response = StreamingHttpResponse(_stream_response(entries, name), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'none'
+    response['Cache-Control'] = 'private, no-transform'
+    return response
@@ -3,15 +3,23 @@ Firebase Authentication utilities for Django integration.
 Handles Firebase token verification and Django user management.
 """
 from firebase_admin import auth
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
+from .caching import CacheNamespace
+from .metrics import external_call
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Decoded claims of verified ID tokens, keyed by a hash of the token
+token_cache = CacheNamespace('firebase_tokens', timeout=settings.FIREBASE_TOKEN_CACHE_TIMEOUT)
+
 
 class FirebaseAuthenticationBackend(BaseBackend):
     """
@@ -32,41 +40,19 @@ class FirebaseAuthenticationBackend(BaseBackend):
         if not firebase_token:
             return None
 
-        try:
-            # Verify the Firebase ID token
-            decoded_token = auth.verify_id_token(firebase_token)
-            uid = decoded_token['uid']
-            email = decoded_token.get('email', '')
-            name = decoded_token.get('name', '')
-
-            # Get or create Django user
-            user, created = User.objects.get_or_create(
-                username=uid,
-                defaults={
-                    'email': email,
-                    'first_name': name.split()[0] if name else '',
-                    'last_name': ' '.join(name.split()[1:]) if len(name.split()) > 1 else '',
-                }
-            )
-
-            # Update email if changed
-            if user.email != email:
-                user.email = email
-                user.save()
-
-            logger.info(f"Firebase authentication successful for user: {uid}")
-            return user
-
-        except auth.InvalidIdTokenError:
-            logger.warning("Invalid Firebase ID token")
-            return None
-        except auth.ExpiredIdTokenError:
-            logger.warning("Expired Firebase ID token")
+        decoded_token = verify_firebase_token(firebase_token, request)
+        if not decoded_token:
             return None
+
+        try:
+            user = sync_firebase_user(decoded_token)
         except Exception as e:
             logger.error(f"Firebase authentication error: {str(e)}")
             return None
 
+        logger.debug(f"Firebase authentication successful for user: {decoded_token['uid']}")
+        return user
+
     def get_user(self, user_id):
         """
         Get user by ID.
@@ -83,25 +69,88 @@ class FirebaseAuthenticationBackend(BaseBackend):
             return None
 
 
-def verify_firebase_token(id_token):
+def sync_firebase_user(decoded_token):
+    """
+    Get or create the Django user for a Firebase account.
+
+    Only writes to the database when the user is new or their email changed.
+
+    Args:
+        decoded_token: decoded Firebase ID token claims
+
+    Returns:
+        User object
+    """
+    uid = decoded_token['uid']
+    email = decoded_token.get('email', '')
+    name = decoded_token.get('name', '')
+
+    user, created = User.objects.get_or_create(
+        username=uid,
+        defaults={
+            'email': email,
+            'first_name': name.split()[0] if name else '',
+            'last_name': ' '.join(name.split()[1:]) if len(name.split()) > 1 else '',
+        }
+    )
+
+    # Update email if changed
+    if not created and user.email != email:
+        user.email = email
+        user.save(update_fields=['email'])
+
+    return user
+
+
+def _token_key(id_token):
+    return token_cache.key(hashlib.sha256(id_token.encode()).hexdigest())
+
+
+def verify_firebase_token(id_token, request=None):
     """
     Verify a Firebase ID token and return the decoded token.
 
+    Verified tokens are cached until they expire (or for
+    FIREBASE_TOKEN_CACHE_TIMEOUT seconds, whichever is sooner), so repeat
+    API calls with the same token skip the signature check. Passing the
+    request also remembers the result on it, so a token is verified at most
+    once per request.
+
     Args:
         id_token: Firebase ID token string
+        request: optional Django request to remember the result on
 
     Returns:
         Decoded token dict if valid, None otherwise
     """
-    try:
-        decoded_token = auth.verify_id_token(id_token)
-        return decoded_token
-    except auth.InvalidIdTokenError:
-        logger.warning("Invalid Firebase ID token")
-        return None
-    except auth.ExpiredIdTokenError:
-        logger.warning("Expired Firebase ID token")
-        return None
-    except Exception as e:
-        logger.error(f"Token verification error: {str(e)}")
-        return None
+    verified = getattr(request, '_firebase_token', None)
+    if verified and verified[0] == id_token:
+        return verified[1]
+
+    key = _token_key(id_token)
+    decoded_token = token_cache.get(key)
+    if decoded_token is not None and decoded_token.get('exp', 0) <= time.time():
+        decoded_token = None
+
+    if decoded_token is None:
+        try:
+            with external_call('firebase'):
+                decoded_token = auth.verify_id_token(id_token)
+        except auth.ExpiredIdTokenError:
+            logger.warning("Expired Firebase ID token")
+            return None
+        except auth.InvalidIdTokenError:
+            logger.warning("Invalid Firebase ID token")
+            return None
+        except Exception as e:
+            logger.error(f"Token verification error: {str(e)}")
+            return None
+
+        lifetime = int(decoded_token.get('exp', 0) - time.time())
+        timeout = min(lifetime, settings.FIREBASE_TOKEN_CACHE_TIMEOUT)
+        if timeout > 0:
+            token_cache.set(key, decoded_token, timeout)
+
+    if request is not None:
+        request._firebase_token = (id_token, decoded_token)
+    return decoded_token
@@ -0,0 +1,268 @@
+"""
+Cached manifests for client gallery pages.
+
+A manifest lists a gallery's photos in display order with everything the
+page needs to render them (derivative URLs, placeholder, dimensions), plus
+the ids of the photos the client selected. The photo list and the selection
+are cached separately, so toggling a selection never rebuilds the photo
+list. Both are kept fresh by the signal handlers in signals.py.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .caching import CacheNamespace
+from .models import Gallery, Photo
+
+# Bumped whenever a photo changes or gallery membership changes from the
+# photo side; single galleries are invalidated by deleting their keys
+gallery_cache = CacheNamespace('galleries', timeout=settings.GALLERY_CACHE_TIMEOUT)
+
+# Layout slot used for gallery tiles
+GALLERY_IMAGE_SLOT = 'grid-large-landscape'
+
+# Selection state for apply_selection() that flips the current one under its lock
+TOGGLE = 'toggle'
+
+# Keyset orderings offered on the photographer dashboard; the last field breaks ties
+DASHBOARD_SORTS = {
+    'newest': ['-created_date', '-id'],
+    'oldest': ['created_date', 'id'],
+    'progress': ['-selection_progress', '-id'],
+    'pending': ['selection_progress', 'id'],
+    'name': ['name', 'id'],
+}
+
+
+def _photos_key(gallery_id):
+    return gallery_cache.key('photos', gallery_id)
+
+
+def _selection_key(gallery_id):
+    return gallery_cache.key('selection', gallery_id)
+
+
+def manifest_entry(photo):
+    """Serialize a photo into a gallery manifest entry."""
+    image = photo.get_responsive_image(GALLERY_IMAGE_SLOT) or {}
+    return {
+        'id': photo.id,
+        'title': photo.title,
+        'src': image.get('src', ''),
+        'srcset': image.get('srcset', ''),
+        'sizes': image.get('sizes', ''),
+        'placeholder': photo.placeholder,
+        'width': photo.width,
+        'height': photo.height,
+    }
+
+
+def client_galleries(client_profile):
+    """
+    Active galleries of a client for the dashboard, in a single query.
+
+    Each gallery carries a photo_count annotation and its cover photo,
+    loaded with just the fields needed to render it.
+    """
+    return (
+        client_profile.galleries.filter(is_active=True)
+        .select_related('cover_photo')
+        .only(
+            'id', 'client', 'name', 'slug', 'description', 'password_protected', 'selected_count', 'created_date',
+            'cover_photo__id', 'cover_photo__title', 'cover_photo__image', 'cover_photo__derivative_urls',
+            'cover_photo__derivative_source', 'cover_photo__placeholder', 'cover_photo__width',
+            'cover_photo__height',
+        )
+        .annotate(photo_count=photo_count_subquery())
+    )
+
+
+def dashboard_galleries(search=''):
+    """
+    Galleries for the photographer dashboard, in a single query per page.
+
+    Each gallery carries photo_count and selection_progress (fraction of
+    its photos the client selected) annotations and its client's user.
+
+    Args:
+        search: words that must each match the gallery name or the
+            client's name, username or email
+
+    Returns:
+        Unordered Gallery queryset; order it with one of DASHBOARD_SORTS
+    """
+    galleries = (
+        Gallery.objects.select_related('client__user')
+        .annotate(photo_count=photo_count_subquery())
+        .annotate(selection_progress=Case(
+            When(photo_count=0, then=Value(0.0)),
+            default=Cast('selected_count', FloatField()) / Cast('photo_count', FloatField()),
+            output_field=FloatField(),
+        ))
+    )
+    for word in search.split():
+        galleries = galleries.filter(
+            Q(name__icontains=word) |
+            Q(client__user__first_name__icontains=word) |
+            Q(client__user__last_name__icontains=word) |
+            Q(client__user__username__icontains=word) |
+            Q(client__user__email__icontains=word)
+        )
+    return galleries
+
+
+def photo_count_subquery():
+    """Correlated subquery counting a gallery's photos, for annotate()."""
+    photo_counts = (
+        Gallery.photos.through.objects.filter(gallery_id=OuterRef('pk'))
+        .order_by().values('gallery_id').annotate(n=Count('id')).values('n')
+    )
+    return Coalesce(Subquery(photo_counts), 0)
+
+
+def get_gallery_photos(gallery_id):
+    """
+    Return the manifest entries of a gallery's photos in display order.
+
+    Built with a single query and cached until the gallery's photos change.
+    """
+    def build():
+        photos = Photo.objects.filter(galleries=gallery_id).only(
+            'id', 'title', 'image', 'derivative_urls', 'derivative_source',
+            'placeholder', 'width', 'height', 'date_uploaded',
+        )
+        return [manifest_entry(photo) for photo in photos]
+
+    return gallery_cache.get_or_set(_photos_key(gallery_id), build)
+
+
+def get_selected_ids(gallery_id):
+    """Return the ids of the photos selected in a gallery, cached until the selection changes."""
+    return gallery_cache.get_or_set(
+        _selection_key(gallery_id),
+        lambda: list(Photo.objects.filter(selected_in_galleries=gallery_id).values_list('id', flat=True)),
+    )
+
+
+def get_gallery_manifest(gallery_id):
+    """
+    Return everything the gallery page renders, in at most two queries.
+
+    Args:
+        gallery_id: Gallery primary key
+
+    Returns:
+        Dict with 'photos' (manifest entries, each with a 'selected' flag),
+        'photo_count' and 'selected_count'
+    """
+    selected = set(get_selected_ids(gallery_id))
+    photos = [
+        dict(entry, selected=entry['id'] in selected)
+        for entry in get_gallery_photos(gallery_id)
+    ]
+    return {
+        'photos': photos,
+        'photo_count': len(photos),
+        'selected_count': len(selected),
+    }
+
+
+def invalidate_gallery_photos(gallery_ids):
+    """Drop the cached photo lists of the given galleries."""
+    for gallery_id in gallery_ids:
+        gallery_cache.delete(_photos_key(gallery_id))
+
+
+def invalidate_gallery_selection(gallery_ids):
+    """Drop the cached selections of the given galleries."""
+    for gallery_id in gallery_ids:
+        gallery_cache.delete(_selection_key(gallery_id))
+
+
+def invalidate_all_galleries():
+    """Drop every cached manifest."""
+    gallery_cache.bump()
+
+
+def refresh_selected_counts(gallery_ids=None):
+    """
+    Recount Gallery.selected_count from the selected_photos table.
+
+    Used when selections change outside apply_selection (admin edits,
+    deleted photos).
+
+    Args:
+        gallery_ids: galleries to recount, or None for all of them
+    """
+    counts = (
+        Gallery.selected_photos.through.objects.filter(gallery_id=OuterRef('pk'))
+        .order_by().values('gallery_id').annotate(n=Count('id')).values('n')
+    )
+    galleries = Gallery.objects.all()
+    if gallery_ids is not None:
+        galleries = galleries.filter(pk__in=gallery_ids)
+    galleries.update(selected_count=Coalesce(Subquery(counts), 0))
+
+
+def apply_selection(gallery, changes):
+    """
+    Select and unselect photos in a gallery in one transaction.
+
+    The gallery row is locked for the duration, so concurrent requests for
+    the same gallery apply one after the other and the counter stays exact.
+    Rows are inserted and deleted in bulk on the selected_photos table, so
+    the number of queries does not depend on the number of changes.
+
+    Args:
+        gallery: Gallery instance
+        changes: dict mapping photo id to True (select), False (unselect)
+            or TOGGLE (flip the state read under the lock); photos that are
+            not in the gallery are ignored
+
+    Returns:
+        Tuple of (dict of photo id -> new state for the photos that were
+        applied, new selected count)
+    """
+    Selected = Gallery.selected_photos.through
+    with transaction.atomic():
+        selected_count = (
+            Gallery.objects.select_for_update()
+            .values_list('selected_count', flat=True)
+            .get(pk=gallery.pk)
+        )
+        in_gallery = set(
+            Gallery.photos.through.objects
+            .filter(gallery_id=gallery.pk, photo_id__in=list(changes))
+            .values_list('photo_id', flat=True)
+        )
+        changes = {photo_id: state for photo_id, state in changes.items() if photo_id in in_gallery}
+        already_selected = set(
+            Selected.objects
+            .filter(gallery_id=gallery.pk, photo_id__in=list(changes))
+            .values_list('photo_id', flat=True)
+        )
+        changes = {
+            photo_id: photo_id not in already_selected if state == TOGGLE else state
+            for photo_id, state in changes.items()
+        }
+
+        to_select = [photo_id for photo_id, state in changes.items() if state and photo_id not in already_selected]
+        to_unselect = [photo_id for photo_id, state in changes.items() if not state and photo_id in already_selected]
+
+        if to_unselect:
+            Selected.objects.filter(gallery_id=gallery.pk, photo_id__in=to_unselect).delete()
+        if to_select:
+            Selected.objects.bulk_create([
+                Selected(gallery_id=gallery.pk, photo_id=photo_id) for photo_id in to_select
+            ])
+
+        delta = len(to_select) - len(to_unselect)
+        if delta:
+            Gallery.objects.filter(pk=gallery.pk).update(selected_count=F('selected_count') + delta)
+        if to_select or to_unselect:
+            # Direct table writes do not send m2m_changed
+            transaction.on_commit(lambda: invalidate_gallery_selection([gallery.pk]))
+
+    gallery.selected_count = selected_count + delta
+    return changes, gallery.selected_count
@@ -0,0 +1,122 @@
+"""
+Cloudinary derivative URLs for named transformation presets.
+
+URLs are built through an in-process LRU cache keyed on the stored image
+value, and the full set for a photo is persisted on Photo.derivative_urls
+when the photo is saved, so rendering never has to assemble URLs.
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+from cloudinary.models import CloudinaryField
+
+
+# Width-stepped derivatives and the matching `sizes` attribute for every
+# layout slot a photo is rendered in. Widths are CSS pixels of the source
+# file, `sizes` mirrors the breakpoints in static/css/style.css.
+RESPONSIVE_IMAGE_SLOTS = {
+    'hero': {
+        'widths': [640, 960, 1280, 1600, 1920, 2560],
+        'sizes': '100vw',
+    },
+    'grid-large-landscape': {
+        'widths': [320, 480, 640, 800, 960, 1280],
+        'sizes': '(max-width: 575px) 100vw, (max-width: 992px) 50vw, 460px',
+    },
+    'about': {
+        'widths': [320, 480, 640, 800, 960],
+        'sizes': '(max-width: 991px) 100vw, 33vw',
+    },
+    'card': {
+        'widths': [320, 480, 640, 800],
+        'sizes': '(max-width: 767px) 100vw, (max-width: 991px) 50vw, 420px',
+    },
+    'lightbox': {
+        'widths': [1024, 1600, 2048],
+        'sizes': '90vw',
+    },
+}
+
+# Named Cloudinary transformations
+IMAGE_PRESETS = {
+    'original': [],
+    'thumbnail': [
+        {'width': 400, 'height': 400, 'crop': 'limit', 'quality': 'auto'}
+    ],
+    'admin_preview': [
+        {'width': 100, 'height': 100, 'crop': 'fill', 'quality': 'auto', 'fetch_format': 'auto'}
+    ],
+    'delivery': [
+        {'width': 2560, 'height': 2560, 'crop': 'limit', 'quality': 'auto:best', 'fetch_format': 'jpg'}
+    ],
+    'placeholder': [
+        {'width': 32, 'crop': 'limit', 'quality': 'auto:low', 'fetch_format': 'jpg'}
+    ],
+    'watermarked': [
+        {'overlay': 'text:Arial_40:Daniel%20Ahlberg', 'gravity': 'south_east', 'x': 20, 'y': 20, 'opacity': 60},
+        {'quality': 'auto', 'fetch_format': 'auto'}
+    ],
+}
+for _width in sorted({w for spec in RESPONSIVE_IMAGE_SLOTS.values() for w in spec['widths']}):
+    IMAGE_PRESETS[f'w{_width}'] = [
+        {'width': _width, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'}
+    ]
+
+# Fingerprint of the preset configuration; persisted URLs built from an
+# older configuration are ignored and rebuilt
+DERIVATIVE_SPEC = hashlib.sha1(
+    json.dumps([IMAGE_PRESETS, RESPONSIVE_IMAGE_SLOTS], sort_keys=True).encode()
+).hexdigest()[:12]
+
+_image_field = CloudinaryField('image')
+
+
+def image_value(image):
+    """Return the stored database value for a Cloudinary image, or '' if empty."""
+    return _image_field.get_prep_value(image) or ''
+
+
+def derivative_source(value):
+    """Identify the image and preset configuration a set of derivative URLs was built from."""
+    return f"{DERIVATIVE_SPEC}:{value}"
+
+
+@lru_cache(maxsize=8192)
+def build_preset_url(value, preset):
+    """
+    Build the URL of a preset derivative.
+
+    Args:
+        value: stored Cloudinary image value (see image_value)
+        preset: key of IMAGE_PRESETS
+
+    Returns:
+        Derivative URL string
+    """
+    resource = _image_field.parse_cloudinary_resource(value)
+    return resource.build_url(transformation=IMAGE_PRESETS[preset])
+
+
+def build_derivatives(value):
+    """
+    Build every preset URL and the responsive src/srcset/sizes per slot.
+
+    Args:
+        value: stored Cloudinary image value
+
+    Returns:
+        Dict with 'presets' (preset name -> URL) and 'slots'
+        (slot name -> {'src', 'srcset', 'sizes'})
+    """
+    presets = {name: build_preset_url(value, name) for name in IMAGE_PRESETS}
+    slots = {}
+    for slot, spec in RESPONSIVE_IMAGE_SLOTS.items():
+        urls = [(width, presets[f'w{width}']) for width in spec['widths']]
+        slots[slot] = {
+            # Middle step is a sensible fallback for browsers without srcset
+            'src': urls[len(urls) // 2][1],
+            'srcset': ', '.join(f"{url} {width}w" for width, url in urls),
+            'sizes': spec['sizes'],
+        }
+    return {'presets': presets, 'slots': slots}
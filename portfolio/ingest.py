@@ -0,0 +1,165 @@
+"""
+Bulk photo ingestion helpers used by `manage.py ingest_photos`.
+
+Files are read from a directory or an archive, analysed (metadata and
+placeholder) and uploaded by worker threads. Uploads go through an uploader
+class named by the PHOTO_INGEST_UPLOADER setting, so the storage backend can
+be swapped out, e.g. for an offline stub.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from datetime import date
+
+import cloudinary
+import cloudinary.uploader
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from .derivatives import render_placeholder
+from .image_urls import image_value
+from .metadata import extract_metadata
+from .metrics import external_call
+
+# Image types Pillow can analyse and Cloudinary accepts
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff'}
+
+
+class CloudinaryUploader:
+    """
+    Upload originals to Cloudinary, into the folder Photo.image uses.
+
+    Public ids are derived from the file contents, and existing images are
+    not overwritten, so uploading the same file twice is harmless.
+    """
+
+    folder = 'portfolio/photos'
+
+    def upload(self, name, data):
+        """
+        Upload one file.
+
+        Args:
+            name: file name inside the source, used for the public id
+            data: file contents
+
+        Returns:
+            Value to store in Photo.image
+        """
+        stem = slugify(posixpath.splitext(posixpath.basename(name))[0]) or 'photo'
+        digest = hashlib.sha1(data).hexdigest()[:10]
+        with external_call('cloudinary'):
+            result = cloudinary.uploader.upload(
+                io.BytesIO(data),
+                folder=self.folder,
+                public_id=f"{stem}-{digest}",
+                overwrite=False,
+                resource_type='image',
+            )
+        return image_value(cloudinary.CloudinaryResource(
+            result['public_id'],
+            format=result.get('format'),
+            version=result.get('version'),
+            type=result.get('type', 'upload'),
+            resource_type=result.get('resource_type', 'image'),
+        ))
+
+
+def get_uploader(path=None):
+    """Instantiate the uploader class at a dotted path (default: PHOTO_INGEST_UPLOADER)."""
+    return import_string(path or settings.PHOTO_INGEST_UPLOADER)()
+
+
+def list_source(source):
+    """
+    List the images in a directory, .zip or tar archive.
+
+    Args:
+        source: path to a directory or archive
+
+    Returns:
+        Tuple of (sorted list of names relative to the source, function
+        reading a name's bytes; safe to call from several threads)
+    """
+    def is_image(name):
+        base = posixpath.basename(name)
+        return not base.startswith('.') and posixpath.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+    if os.path.isdir(source):
+        names = []
+        for root, dirs, files in os.walk(source):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), source).replace(os.sep, '/')
+                if is_image(name):
+                    names.append(name)
+
+        def read(name):
+            with open(os.path.join(source, *name.split('/')), 'rb') as f:
+                return f.read()
+        return sorted(names), read
+
+    # Archive members are read one at a time; the archive object is not thread-safe
+    lock = threading.Lock()
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        names = [info.filename for info in archive.infolist() if not info.is_dir() and is_image(info.filename)]
+
+        def read(name):
+            with lock:
+                return archive.read(name)
+        return sorted(names), read
+
+    if tarfile.is_tarfile(source):
+        archive = tarfile.open(source)
+        names = [member.name for member in archive.getmembers() if member.isfile() and is_image(member.name)]
+
+        def read(name):
+            with lock:
+                return archive.extractfile(name).read()
+        return sorted(names), read
+
+    raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+def title_for(name):
+    """Turn a file name into a readable default title, e.g. 'dsc_0423.jpg' -> 'dsc 0423'."""
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return ' '.join(stem.replace('_', ' ').replace('-', ' ').split())[:200]
+
+
+def prepare_file(name, read, uploader):
+    """
+    Analyse and upload one file (worker thread entry point).
+
+    Returns:
+        JSON-serializable dict with the stored image value, placeholder and
+        metadata, ready to be recorded in the manifest
+    """
+    data = read(name)
+    try:
+        metadata = extract_metadata(data)
+        placeholder = render_placeholder(data)
+    except Exception:
+        metadata, placeholder = {}, ''
+    if metadata.get('date_taken'):
+        metadata['date_taken'] = metadata['date_taken'].isoformat()
+
+    return {
+        'value': uploader.upload(name, data),
+        'placeholder': placeholder,
+        'metadata': metadata,
+    }
+
+
+def decode_metadata(metadata):
+    """Undo the JSON encoding applied by prepare_file."""
+    metadata = dict(metadata)
+    if metadata.get('date_taken'):
+        metadata['date_taken'] = date.fromisoformat(metadata['date_taken'])
+    return metadata
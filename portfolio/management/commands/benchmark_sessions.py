@@ -0,0 +1,115 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from portfolio.models import ClientProfile, Gallery, Photo
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark's temporary data"""
+
+
+class Command(BaseCommand):
+    help = 'Compare DB queries and latency per request for each session engine while a client browses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Requests measured per page and engine',
+        )
+        parser.add_argument(
+            '--engines',
+            default=','.join(settings.SESSION_ENGINES),
+            help='Comma-separated SESSION_BACKEND names to compare',
+        )
+
+    def handle(self, *args, **options):
+        engines = [engine.strip() for engine in options['engines'].split(',') if engine.strip()]
+        unknown = [engine for engine in engines if engine not in settings.SESSION_ENGINES]
+        if unknown or not engines:
+            raise CommandError(
+                f"Unknown session engine(s): {', '.join(unknown) or '(none given)'}; "
+                f"choose from {', '.join(settings.SESSION_ENGINES)}"
+            )
+        results = {}
+        try:
+            # Everything the benchmark creates, sessions included, is rolled back
+            with transaction.atomic():
+                pages = self.create_client()
+                for engine in engines:
+                    results[engine] = self.run(settings.SESSION_ENGINES[engine], pages, options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"engine":<16}{"page":<18}{"queries":>9}{"median ms":>12}{"p95 ms":>10}')
+        for engine, pages in results.items():
+            for page, (queries, timings) in pages.items():
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f'{engine:<16}{page:<18}{queries:>9.1f}'
+                    f'{statistics.median(timings) * 1000:>12.2f}{p95 * 1000:>10.2f}'
+                )
+        self.stdout.write(self.style.SUCCESS(f'Benchmarked {len(results)} session engine(s) on {settings.CACHES["default"]["BACKEND"]}'))
+
+    def create_client(self):
+        """Create a client with an unlocked, password-protected gallery and return the pages to browse."""
+        # Reused if left behind, e.g. by a run on a database without transactions
+        user, _ = User.objects.get_or_create(username='session-benchmark')
+        client_profile, _ = ClientProfile.objects.get_or_create(user=user, defaults={'session_type': 'Benchmark'})
+        gallery, _ = Gallery.objects.update_or_create(
+            slug='session-benchmark',
+            defaults={
+                'name': 'Session benchmark',
+                'client': client_profile,
+                'password_protected': True,
+                'access_password': 'benchmark',
+                'is_active': True,
+            },
+        )
+        gallery.photos.set(Photo.objects.order_by('id').values_list('id', flat=True)[:24])
+        return {
+            'client_gallery': reverse('portfolio:client_gallery'),
+            'gallery_detail': reverse('portfolio:gallery_detail', args=[gallery.slug]),
+        }
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def run(self, engine, pages, count):
+        """
+        Log a client in with the given session engine and browse their gallery pages.
+
+        Returns:
+            Dict mapping page name to (average queries per request, list of latencies)
+        """
+        with override_settings(SESSION_ENGINE=engine):
+            client = Client()
+            client.force_login(User.objects.get(username='session-benchmark'))
+            # Unlock the gallery once, as a client would
+            client.post(pages['gallery_detail'], {'password': 'benchmark'}, secure=True)
+            response = client.get(pages['gallery_detail'], secure=True)
+            assert b'requires a password' not in response.content, 'gallery was not unlocked'
+
+            results = {}
+            for page, url in pages.items():
+                client.get(url, secure=True)
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(count):
+                        start = time.perf_counter()
+                        response = client.get(url, secure=True)
+                        timings.append(time.perf_counter() - start)
+                        assert response.status_code == 200, f'{url} returned {response.status_code}'
+                results[page] = (len(queries) / count, timings)
+            return results
@@ -0,0 +1,27 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.assets import build_assets, dist_root
+
+
+class Command(BaseCommand):
+    help = 'Minify CSS/JS, extract critical CSS and render icon variants into static/dist (run before collectstatic)'
+
+    def handle(self, *args, **options):
+        try:
+            asset_map = build_assets()
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        root = os.path.dirname(dist_root())
+        for source, built in sorted(asset_map['files'].items()):
+            self.stdout.write(f'  {source} -> {built} ({self.size(root, built)})')
+        for page, built in sorted(asset_map['critical'].items()):
+            self.stdout.write(f'  critical CSS for {page} -> {built} ({self.size(root, built)})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {len(asset_map["files"])} asset(s) and critical CSS for {len(asset_map["critical"])} page(s)'
+        ))
+
+    def size(self, root, name):
+        return f'{os.path.getsize(os.path.join(root, *name.split("/"))) / 1024:.1f} KB'
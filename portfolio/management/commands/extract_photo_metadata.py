@@ -0,0 +1,60 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from portfolio.catalog import bump_catalog_version
+from portfolio.derivatives import process_in_pool
+from portfolio.metadata import fetch_metadata
+from portfolio.models import Photo
+
+METADATA_FIELDS = [
+    'width', 'height', 'aspect_ratio', 'orientation', 'camera', 'lens',
+    'exposure_time', 'aperture', 'iso', 'focal_length', 'date_taken',
+]
+
+
+class Command(BaseCommand):
+    help = 'Extract dimensions and EXIF metadata for photos that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes used for downloading and parsing',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Photos processed (and saved) per batch; progress survives interruption between batches',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-extract metadata for every photo',
+        )
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.only('id', 'image', 'derivative_urls', 'derivative_source', *METADATA_FIELDS).order_by('id')
+        if not options['force']:
+            # Photos without dimensions have never been processed
+            photos = photos.filter(width__isnull=True)
+        pending = [photo for photo in photos.iterator() if photo.image]
+
+        self.stdout.write(f'{len(pending)} photo(s) need metadata')
+
+        updated, failed = process_in_pool(
+            pending,
+            lambda photo: (fetch_metadata, photo.get_preset_url('original')),
+            lambda photo, metadata: photo.apply_metadata(metadata),
+            METADATA_FIELDS,
+            options['batch_size'],
+            options['workers'],
+            stdout=self.stdout.write,
+            stderr=self.stderr.write,
+        )
+
+        if updated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Extracted metadata for {updated} photo(s), {failed} failed'))
@@ -0,0 +1,80 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.catalog import bump_catalog_version
+from portfolio.derivatives import (
+    DERIVATIVE_WIDTHS, build_local_slots, enabled_formats, fetch_and_render, local_derivatives_current,
+    original_url, process_in_pool, store_variants,
+)
+from portfolio.image_urls import image_value
+from portfolio.models import Photo
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/AVIF/JPEG derivatives of photo originals into the default file storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes used for resizing and encoding',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Photos processed (and saved) per batch; progress survives interruption between batches',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after this many photos',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives even for photos that already have them',
+        )
+
+    def handle(self, *args, **options):
+        formats = enabled_formats()
+        if not formats:
+            raise CommandError('No usable formats in IMAGE_DERIVATIVE_FORMATS')
+
+        photos = Photo.objects.only('id', 'image', 'derivative_urls', 'derivative_source').order_by('id')
+        pending = [
+            photo for photo in photos.iterator()
+            if photo.image and (options['force'] or not local_derivatives_current(photo))
+        ]
+        if options['limit']:
+            pending = pending[:options['limit']]
+
+        self.stdout.write(f'{len(pending)} photo(s) need derivatives ({", ".join(formats)})')
+
+        def apply(photo, result):
+            _, _, variants = result
+            local = store_variants(image_value(photo.image), variants)
+            local['slots'] = build_local_slots(local, formats[0])
+            photo.refresh_derivative_urls()
+            photo.derivative_urls['local'] = local
+
+        def task(photo):
+            return fetch_and_render, original_url(photo), DERIVATIVE_WIDTHS, formats, settings.IMAGE_DERIVATIVE_QUALITY
+
+        generated, failed = process_in_pool(
+            pending,
+            task,
+            apply,
+            ['derivative_urls', 'derivative_source'],
+            options['batch_size'],
+            options['workers'],
+            stdout=self.stdout.write,
+            stderr=self.stderr.write,
+        )
+
+        if generated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {generated} photo(s), {failed} failed'))
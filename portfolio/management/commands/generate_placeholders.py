@@ -0,0 +1,70 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from portfolio.catalog import bump_catalog_version
+from portfolio.derivatives import fetch_placeholder, process_in_pool
+from portfolio.models import Photo
+
+
+class Command(BaseCommand):
+    help = 'Render the inline low-quality placeholder for photos that do not have one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes used for downloading and rendering',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Photos processed (and saved) per batch',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render placeholders for every photo',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry photos whose placeholder failed to render before',
+        )
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.only('id', 'image', 'derivative_urls', 'derivative_source', 'placeholder', 'placeholder_failed').order_by('id')
+        if not options['force']:
+            photos = photos.filter(placeholder='')
+            if not options['retry_failed']:
+                photos = photos.filter(placeholder_failed=False)
+        pending = [photo for photo in photos.iterator() if photo.image]
+
+        self.stdout.write(f'{len(pending)} photo(s) need placeholders')
+
+        def apply(photo, placeholder):
+            photo.placeholder = placeholder
+            photo.placeholder_failed = False
+
+        def keep_failed(photo, error):
+            # Remembered, so later runs skip it unless asked to retry; a
+            # placeholder from an earlier run is kept
+            photo.placeholder_failed = not photo.placeholder
+
+        generated, failed = process_in_pool(
+            pending,
+            lambda photo: (fetch_placeholder, photo.get_preset_url('placeholder')),
+            apply,
+            ['placeholder', 'placeholder_failed'],
+            options['batch_size'],
+            options['workers'],
+            stdout=self.stdout.write,
+            stderr=self.stderr.write,
+            keep_failed=keep_failed,
+        )
+
+        if generated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Rendered {generated} placeholder(s), {failed} failed'))
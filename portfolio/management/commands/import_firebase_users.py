@@ -0,0 +1,220 @@
+import csv
+import json
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from portfolio.models import ClientProfile
+
+User = get_user_model()
+
+# Column positions in a `firebase auth:export --format=csv` file, which has no header row
+CSV_COLUMNS = {
+    'uid': 0,
+    'email': 1,
+    'name': 5,
+    'phone': 25,
+}
+
+USER_FIELDS = ['email', 'first_name', 'last_name', 'is_active']
+
+
+def split_name(name):
+    """Split a display name into Django's first_name and last_name."""
+    parts = (name or '').split()
+    return (parts[0] if parts else '')[:150], ' '.join(parts[1:])[:150]
+
+
+def read_export(path):
+    """
+    Read a Firebase Auth user export.
+
+    Args:
+        path: JSON file from `firebase auth:export users.json` or CSV file
+            from `firebase auth:export users.csv --format=csv`
+
+    Returns:
+        List of dicts with uid, email, name, phone and disabled; disabled is
+        None when the export does not say (CSV exports have no such column)
+    """
+    if path.endswith('.csv'):
+        accounts = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if not row or row[0] in ('', 'UID'):
+                    continue
+                row += [''] * (max(CSV_COLUMNS.values()) + 1 - len(row))
+                accounts.append({
+                    'uid': row[CSV_COLUMNS['uid']],
+                    'email': row[CSV_COLUMNS['email']],
+                    'name': row[CSV_COLUMNS['name']],
+                    'phone': row[CSV_COLUMNS['phone']],
+                    'disabled': None,
+                })
+        return accounts
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [
+        {
+            'uid': user['localId'],
+            'email': user.get('email', ''),
+            'name': user.get('displayName', ''),
+            'phone': user.get('phoneNumber', ''),
+            'disabled': user.get('disabled'),
+        }
+        for user in data.get('users', [])
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Create or update Django users and client profiles from a Firebase Auth user export'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'export',
+            help='Path to a Firebase Auth export (.json or .csv)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows written per bulk query',
+        )
+        parser.add_argument(
+            '--no-profiles',
+            action='store_true',
+            help='Only sync users; do not create or update client profiles',
+        )
+        parser.add_argument(
+            '--session-type',
+            default='',
+            help='Session type for newly created client profiles, e.g. "Wedding"',
+        )
+        parser.add_argument(
+            '--session-date',
+            type=date.fromisoformat,
+            help='Session date (YYYY-MM-DD) for newly created client profiles',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change and roll everything back',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            accounts = read_export(options['export'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read {options["export"]}: {e}')
+
+        # Last entry wins if the export lists a uid twice
+        accounts = {account['uid']: account for account in accounts if account['uid']}
+        self.stdout.write(f'{len(accounts)} account(s) in export')
+        batch_size = options['batch_size']
+
+        existing = User.objects.in_bulk(list(accounts), field_name='username')
+        to_create, to_update = self.diff_users(accounts, existing)
+        self.stdout.write(f'  {len(to_create)} user(s) to create, {len(to_update)} to update')
+
+        profiles_created = profiles_updated = 0
+        with transaction.atomic():
+            self.write_users(to_create, to_update, batch_size)
+            if not options['no_profiles']:
+                profiles_created, profiles_updated = self.sync_profiles(accounts, options)
+
+            # A dry run does all the work and then throws it away
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        prefix = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {len(to_create)} new user(s), updated {len(to_update)}; '
+            f'{profiles_created} new client profile(s), updated {profiles_updated}'
+        ))
+
+    def diff_users(self, accounts, existing):
+        """
+        Compare the export with existing users.
+
+        Returns:
+            Tuple of (unsaved new users, existing users with changed fields)
+        """
+        to_create, to_update = [], []
+        for uid, account in accounts.items():
+            first_name, last_name = split_name(account['name'])
+            user = existing.get(uid)
+            if user is None:
+                user = User(
+                    username=uid,
+                    email=account['email'],
+                    first_name=first_name,
+                    last_name=last_name,
+                    is_active=not account['disabled'],
+                )
+                user.set_unusable_password()
+                to_create.append(user)
+                continue
+
+            changed = False
+            # An export without an email does not clear the one stored in Django
+            if account['email'] and user.email != account['email']:
+                user.email = account['email']
+                changed = True
+            # Names edited in Django are kept; only fill in missing ones
+            if not user.first_name and not user.last_name and (first_name or last_name):
+                user.first_name, user.last_name = first_name, last_name
+                changed = True
+            # Only exports that record the disabled flag decide is_active, so users
+            # deactivated in Django stay inactive when importing a CSV export
+            if account['disabled'] is not None and user.is_active == account['disabled']:
+                user.is_active = not account['disabled']
+                changed = True
+            if changed:
+                to_update.append(user)
+        return to_create, to_update
+
+    def write_users(self, to_create, to_update, batch_size):
+        for start in range(0, len(to_create), batch_size):
+            User.objects.bulk_create(to_create[start:start + batch_size])
+            self.stdout.write(f'  ...{min(start + batch_size, len(to_create))}/{len(to_create)} users created')
+        for start in range(0, len(to_update), batch_size):
+            User.objects.bulk_update(to_update[start:start + batch_size], USER_FIELDS)
+            self.stdout.write(f'  ...{min(start + batch_size, len(to_update))}/{len(to_update)} users updated')
+
+    def sync_profiles(self, accounts, options):
+        """
+        Create missing client profiles and fill in phone numbers.
+
+        Returns:
+            Tuple of (profiles created, profiles updated)
+        """
+        batch_size = options['batch_size']
+        users = User.objects.filter(username__in=list(accounts)).only('id', 'username')
+        profiles = {
+            profile.user_id: profile
+            for profile in ClientProfile.objects.filter(user__in=users).only('id', 'user_id', 'phone')
+        }
+
+        to_create, to_update = [], []
+        for user in users:
+            phone = accounts[user.username]['phone'][:20]
+            profile = profiles.get(user.id)
+            if profile is None:
+                to_create.append(ClientProfile(
+                    user=user,
+                    phone=phone,
+                    session_type=options['session_type'],
+                    session_date=options['session_date'],
+                ))
+            elif phone and profile.phone != phone:
+                profile.phone = phone
+                to_update.append(profile)
+
+        for start in range(0, len(to_create), batch_size):
+            ClientProfile.objects.bulk_create(to_create[start:start + batch_size])
+            self.stdout.write(f'  ...{min(start + batch_size, len(to_create))}/{len(to_create)} profiles created')
+        ClientProfile.objects.bulk_update(to_update, ['phone'], batch_size=batch_size)
+        return len(to_create), len(to_update)
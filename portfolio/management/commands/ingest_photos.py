@@ -0,0 +1,185 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.catalog import bump_catalog_version
+from portfolio.ingest import decode_metadata, get_uploader, list_source, prepare_file, title_for
+from portfolio.image_urls import image_value
+from portfolio.models import Category, Photo
+
+
+class Command(BaseCommand):
+    help = 'Upload a directory or archive of photos into a category, in parallel and resumably'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Directory, .zip or tar archive of images',
+        )
+        parser.add_argument(
+            '--category',
+            required=True,
+            help='Slug of the category the photos are added to',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of concurrent uploads',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Photos created (and recorded in the manifest) per batch',
+        )
+        parser.add_argument(
+            '--manifest',
+            help='Progress file used to resume an interrupted run (default: <source>.ingest.json)',
+        )
+        parser.add_argument(
+            '--private',
+            action='store_true',
+            help='Create the photos hidden from the public portfolio',
+        )
+        parser.add_argument(
+            '--uploader',
+            help='Dotted path of the uploader class (default: PHOTO_INGEST_UPLOADER)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            category = Category.objects.get(slug=options['category'])
+        except Category.DoesNotExist:
+            raise CommandError(f'Category "{options["category"]}" does not exist')
+
+        source = os.path.abspath(options['source'].rstrip('/\\'))
+        try:
+            names, read = list_source(source)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.manifest_path = options['manifest'] or f'{source}.ingest.json'
+        self.manifest = self.load_manifest(source, category)
+        files = self.manifest['files']
+        uploader = get_uploader(options['uploader'])
+
+        done = [name for name in names if files.get(name, {}).get('photo_id')]
+        # Uploaded by an interrupted run but never saved as photos
+        uploaded = [name for name in names if 'value' in files.get(name, {}) and name not in done]
+        pending = [name for name in names if name not in done and name not in uploaded]
+        self.stdout.write(
+            f'{len(names)} image(s) in source: {len(done)} already imported, '
+            f'{len(uploaded)} uploaded but not saved, {len(pending)} to upload'
+        )
+
+        self.category = category
+        self.is_public = not options['private']
+        self.batch = list(uploaded)
+        self.batch_size = options['batch_size']
+        self.created = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            queue = iter(pending)
+            running = {}
+            # Keep only a bounded number of files in flight, so archives are not read into memory at once
+            while True:
+                while len(running) < options['workers'] * 2:
+                    name = next(queue, None)
+                    if name is None:
+                        break
+                    running[executor.submit(prepare_file, name, read, uploader)] = name
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        files[name] = future.result()
+                    except Exception as e:
+                        failed += 1
+                        files[name] = {'error': str(e)}
+                        self.stderr.write(f'❌ {name}: {e}')
+                        continue
+                    self.batch.append(name)
+
+                if len(self.batch) >= self.batch_size:
+                    self.flush()
+            self.flush()
+
+        if self.created:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.created} photo(s) into {category.name}, {failed} failed. '
+            f'Progress is recorded in {self.manifest_path}'
+        ))
+
+    def load_manifest(self, source, category):
+        if not os.path.exists(self.manifest_path):
+            return {'source': source, 'category': category.slug, 'files': {}}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('category') != category.slug:
+            raise CommandError(
+                f'{self.manifest_path} belongs to an import into "{manifest.get("category")}"; '
+                f'pass --manifest to start a separate one'
+            )
+        return manifest
+
+    def save_manifest(self):
+        """Write the manifest atomically, so an interruption never leaves it half-written"""
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def flush(self):
+        """Create Photo rows for the uploaded files in the current batch and record them"""
+        files = self.manifest['files']
+        while self.batch:
+            names, self.batch = self.batch[:self.batch_size], self.batch[self.batch_size:]
+            values = {files[name]['value'] for name in names}
+            # Photos created by a run that died before recording them in the manifest
+            ids = self.existing_photo_ids(values)
+
+            photos = []
+            for name in names:
+                entry = files[name]
+                if entry['value'] in ids or any(photo.image == entry['value'] for photo in photos):
+                    continue
+                photo = Photo(
+                    title=title_for(name),
+                    image=entry['value'],
+                    category=self.category,
+                    is_public=self.is_public,
+                    placeholder=entry.get('placeholder', ''),
+                )
+                photo.apply_metadata(decode_metadata(entry.get('metadata', {})))
+                photo.refresh_derivative_urls()
+                photos.append(photo)
+
+            Photo.objects.bulk_create(photos)
+            if any(photo.pk is None for photo in photos):
+                # Backends that do not return primary keys from bulk inserts
+                ids = self.existing_photo_ids(values)
+            else:
+                ids.update({photo.image: photo.pk for photo in photos})
+            for name in names:
+                files[name]['photo_id'] = ids.get(files[name]['value'])
+
+            self.save_manifest()
+            self.created += len(photos)
+            self.stdout.write(f'  ...{self.created} photo(s) created')
+        # Record failures and uploads even when no photo was created
+        self.save_manifest()
+
+    def existing_photo_ids(self, values):
+        """Map stored image values that already have a Photo to its id"""
+        return {
+            image_value(image): pk
+            for image, pk in Photo.objects.filter(image__in=values).values_list('image', 'id')
+        }
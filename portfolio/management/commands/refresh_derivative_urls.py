@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.catalog import bump_catalog_version
+from portfolio.models import Photo
+
+
+class Command(BaseCommand):
+    help = 'Build and store Cloudinary derivative URLs for photos whose image or presets changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild URLs for every photo, even if they look up to date',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of photos written per bulk update',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        photos = Photo.objects.only('id', 'image', 'derivative_urls', 'derivative_source')
+
+        batch = []
+        updated = 0
+        for photo in photos.iterator(chunk_size=batch_size):
+            if photo.refresh_derivative_urls(force=options['force']):
+                batch.append(photo)
+            if len(batch) >= batch_size:
+                updated += self.flush(batch)
+
+        updated += self.flush(batch)
+
+        if updated:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed derivative URLs for {updated} photo(s)'))
+
+    def flush(self, batch):
+        """Write a batch of refreshed photos and clear it"""
+        if not batch:
+            return 0
+        Photo.objects.bulk_update(batch, ['derivative_urls', 'derivative_source'])
+        count = len(batch)
+        batch.clear()
+        self.stdout.write(f'  ...{count} photo(s) written')
+        return count
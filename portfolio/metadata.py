@@ -0,0 +1,132 @@
+"""
+Image dimension and EXIF extraction.
+
+Dimensions are reported as displayed, i.e. after applying the EXIF
+orientation, so templates can emit correct width/height attributes.
+"""
+import io
+from datetime import datetime
+
+import requests
+from PIL import ExifTags, Image
+
+# EXIF orientations that rotate the image by 90 degrees
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Bytes requested first when only the headers are needed; EXIF lives in the
+# first APP1 segment, which is almost always well inside this range
+HEADER_BYTES = 256 * 1024
+
+
+def _ratio(value):
+    """Convert an EXIF rational (IFDRational or tuple) to a float."""
+    if value is None:
+        return None
+    if isinstance(value, tuple):
+        numerator, denominator = value
+        return numerator / denominator if denominator else None
+    try:
+        return float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _text(value, max_length):
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        value = value.decode(errors='ignore')
+    return str(value).strip('\x00 ').strip()[:max_length]
+
+
+def format_exposure_time(seconds):
+    """Format an exposure time as photographers write it, e.g. 1/250s or 2s."""
+    if not seconds:
+        return ''
+    if seconds < 1:
+        return f"1/{round(1 / seconds)}s"
+    return f"{seconds:g}s"
+
+
+def orientation_for(width, height):
+    """Classify dimensions as landscape, portrait or square."""
+    if not width or not height:
+        return ''
+    if abs(width - height) <= 0.02 * max(width, height):
+        return 'square'
+    return 'landscape' if width > height else 'portrait'
+
+
+def extract_metadata(data):
+    """
+    Read dimensions and key EXIF fields from image bytes.
+
+    Only the image headers are parsed, so truncated data works as long as
+    it covers them.
+
+    Args:
+        data: bytes of the image (or of its first HEADER_BYTES)
+
+    Returns:
+        Dict with width, height, aspect_ratio, orientation, camera, lens,
+        exposure_time, aperture, iso, focal_length and date_taken (any of
+        the EXIF values may be empty)
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        exif = image.getexif()
+
+    if exif.get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+        width, height = height, width
+
+    details = exif.get_ifd(ExifTags.IFD.Exif)
+    make = _text(exif.get(ExifTags.Base.Make), 50)
+    model = _text(exif.get(ExifTags.Base.Model), 100)
+    camera = model if not make or model.lower().startswith(make.lower()) else f"{make} {model}"
+
+    iso = details.get(ExifTags.Base.ISOSpeedRatings)
+    if isinstance(iso, tuple):
+        iso = iso[0] if iso else None
+
+    date_taken = None
+    raw_date = _text(details.get(ExifTags.Base.DateTimeOriginal) or exif.get(ExifTags.Base.DateTime), 19)
+    if raw_date:
+        try:
+            date_taken = datetime.strptime(raw_date, '%Y:%m:%d %H:%M:%S').date()
+        except ValueError:
+            pass
+
+    aperture = _ratio(details.get(ExifTags.Base.FNumber))
+    focal_length = _ratio(details.get(ExifTags.Base.FocalLength))
+    return {
+        'width': width,
+        'height': height,
+        'aspect_ratio': round(width / height, 4) if height else None,
+        'orientation': orientation_for(width, height),
+        'camera': camera[:100],
+        'lens': _text(details.get(ExifTags.Base.LensModel), 100),
+        'exposure_time': format_exposure_time(_ratio(details.get(ExifTags.Base.ExposureTime))),
+        'aperture': round(aperture, 1) if aperture else None,
+        'iso': int(iso) if iso else None,
+        'focal_length': round(focal_length, 1) if focal_length else None,
+        'date_taken': date_taken,
+    }
+
+
+def fetch_metadata(url):
+    """
+    Download just enough of an image to read its metadata (worker process entry point).
+
+    Asks for the first HEADER_BYTES with a Range request and falls back to
+    the whole file if the headers turn out to be further in.
+    """
+    response = requests.get(url, headers={'Range': f'bytes=0-{HEADER_BYTES - 1}'}, timeout=60)
+    response.raise_for_status()
+    try:
+        return extract_metadata(response.content)
+    except Exception:
+        if response.status_code != 206:
+            raise
+    response = requests.get(url, timeout=120)
+    response.raise_for_status()
+    return extract_metadata(response.content)
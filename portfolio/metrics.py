@@ -0,0 +1,325 @@
+"""
+Request metrics: latency per route, SQL, template and external-call time.
+
+MetricsMiddleware measures every request and attributes database queries
+(through a connection execute wrapper), template rendering (through the
+TimedDjangoTemplates backend) and calls to external services (through the
+external_call() context manager) to it. Staff responses carry the
+breakdown in a Server-Timing header.
+
+Like the cache statistics, the numbers are accumulated in-process and
+periodically added to counters in the shared cache, so /metrics reports
+every gunicorn worker in the Prometheus text format. Times are stored as
+whole microseconds because cache counters are integers.
+
+The local-memory cache is private to each process; with it every worker
+keeps its own counters and /metrics labels them with worker="<pid>", so a
+scrape that lands on another worker reads different series instead of a
+counter that went backwards.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from .caching import delete_counters, get_counters, incr_counter, shared_cache
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = 'metrics'
+SERIES_KEY = f'{METRICS_PREFIX}:series'
+
+# Flush in-process metrics to the shared cache after this many requests or seconds
+METRICS_FLUSH_EVERY = 50
+METRICS_FLUSH_SECONDS = 10
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name -> (Prometheus type, help text)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by route, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Time to produce a response, by route'),
+    'db_queries_total': ('counter', 'SQL queries by route'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries, by route'),
+    'template_render_duration_seconds_total': ('counter', 'Time spent rendering templates, by route'),
+    'external_calls_total': ('counter', 'Calls to external services, by route and service'),
+    'external_call_duration_seconds_total': ('counter', 'Time spent calling external services, by route and service'),
+}
+
+_current = ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+_pending = {}
+_pending_requests = 0
+_last_flush = time.monotonic()
+# Series this process has produced, re-checked against the shared index on every flush
+_seen_series = set()
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # service -> [calls, seconds]
+        self.external = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, duration):
+        """Format the timings as a Server-Timing header value."""
+        entries = [
+            f'total;dur={duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'template;dur={self.template_time * 1000:.1f}',
+        ]
+        for service, (calls, seconds) in sorted(self.external.items()):
+            entries.append(f'{service};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        return ', '.join(entries)
+
+
+def current_metrics():
+    """The RequestMetrics of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextmanager
+def collect_request():
+    """
+    Collect metrics for the code run inside the block.
+
+    Yields:
+        RequestMetrics that is filled in while the block runs
+    """
+    request_metrics = RequestMetrics()
+    token = _current.set(request_metrics)
+
+    def record_query(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            request_metrics.queries += 1
+            request_metrics.db_time += time.perf_counter() - start
+
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            yield request_metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def external_call(service):
+    """
+    Time a call to an external service (e.g. 'firebase', 'cloudinary').
+
+    Outside a request the block simply runs.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics = _current.get()
+        if request_metrics is not None:
+            calls = request_metrics.external.setdefault(service, [0, 0.0])
+            calls[0] += 1
+            calls[1] += time.perf_counter() - start
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        request_metrics = _current.get()
+        if request_metrics is None:
+            return super().render(context, request)
+        # Templates rendered from inside another template are already counted
+        request_metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_depth -= 1
+            if not request_metrics.template_depth:
+                request_metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend that adds render time to the request metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _add(name, labels, value):
+    series = (name, tuple(labels.items()))
+    _pending[series] = _pending.get(series, 0) + value
+
+
+def record_request(route, method, status, duration, request_metrics):
+    """
+    Add a finished request to the in-process metrics.
+
+    Args:
+        route: URL pattern name, e.g. 'portfolio:home'
+        method: HTTP method
+        status: response status code
+        duration: seconds spent producing the response
+        request_metrics: RequestMetrics collected for the request
+    """
+    global _pending_requests
+    bucket = next((str(bound) for bound in LATENCY_BUCKETS if duration <= bound), '+Inf')
+    with _lock:
+        _add('http_requests_total', {'route': route, 'method': method, 'status': str(status)}, 1)
+        _add('http_request_duration_seconds_bucket', {'route': route, 'method': method, 'le': bucket}, 1)
+        _add('http_request_duration_seconds_sum', {'route': route, 'method': method}, _micros(duration))
+        _add('http_request_duration_seconds_count', {'route': route, 'method': method}, 1)
+        _add('db_queries_total', {'route': route}, request_metrics.queries)
+        _add('db_query_duration_seconds_total', {'route': route}, _micros(request_metrics.db_time))
+        _add('template_render_duration_seconds_total', {'route': route}, _micros(request_metrics.template_time))
+        for service, (calls, seconds) in request_metrics.external.items():
+            _add('external_calls_total', {'route': route, 'service': service}, calls)
+            _add('external_call_duration_seconds_total', {'route': route, 'service': service}, _micros(seconds))
+        _pending_requests += 1
+        due = (
+            _pending_requests >= METRICS_FLUSH_EVERY or
+            time.monotonic() - _last_flush >= METRICS_FLUSH_SECONDS
+        )
+    if due:
+        flush_metrics()
+
+    if settings.METRICS_SLOW_REQUEST_MS and duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+        logger.warning(
+            f"Slow request {method} {route} {status}: {duration * 1000:.0f}ms, "
+            f"{request_metrics.queries} queries in {request_metrics.db_time * 1000:.0f}ms, "
+            f"templates {request_metrics.template_time * 1000:.0f}ms"
+        )
+
+
+def _micros(seconds):
+    return round(seconds * 1_000_000)
+
+
+def _series_key(series):
+    name, labels = series
+    return ':'.join([METRICS_PREFIX, name] + [f'{label}={value}' for label, value in labels])
+
+
+def flush_metrics():
+    """Add the in-process metrics to the shared counters."""
+    global _pending, _pending_requests, _last_flush
+    with _lock:
+        pending, _pending = _pending, {}
+        _pending_requests = 0
+        _last_flush = time.monotonic()
+        _seen_series.update(pending)
+        seen = set(_seen_series)
+
+    for series, delta in pending.items():
+        if delta:
+            incr_counter(_series_key(series), delta)
+
+    if not shared_cache():
+        return
+    # Workers add their series to a shared index; concurrent updates can lose
+    # one, so every flush checks again and re-adds what is missing
+    index = set(cache.get(SERIES_KEY, []))
+    if not seen <= index:
+        cache.set(SERIES_KEY, sorted(index | seen), None)
+
+
+def _series_index():
+    """Every series recorded so far: by all workers, or by this one when the cache is per process."""
+    if not shared_cache():
+        with _lock:
+            return sorted(_seen_series)
+    return [(name, tuple(map(tuple, labels))) for name, labels in cache.get(SERIES_KEY, [])]
+
+
+def reset_metrics():
+    """Clear the shared metrics."""
+    flush_metrics()
+    delete_counters([_series_key(series) for series in _series_index()])
+    cache.delete(SERIES_KEY)
+    with _lock:
+        _seen_series.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in labels) + '}'
+
+
+def _format_value(name, value):
+    if name.endswith(('_seconds_total', '_seconds_sum')):
+        return f'{value / 1_000_000:.6f}'
+    return str(value)
+
+
+def render_prometheus():
+    """
+    Render the shared metrics in the Prometheus text exposition format.
+
+    Returns:
+        str
+    """
+    flush_metrics()
+    index = _series_index()
+    values = get_counters([_series_key(series) for series in index])
+    # Per-process counters are told apart by worker, so each series stays monotonic
+    worker = () if shared_cache() else (('worker', str(os.getpid())),)
+    samples = {(name, labels + worker): values[_series_key((name, labels))] for name, labels in index}
+
+    lines = []
+    for metric, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {kind}')
+        if kind == 'histogram':
+            lines.extend(_histogram_lines(metric, samples))
+            continue
+        for (name, labels), value in sorted(samples.items()):
+            if name == metric:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(name, value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(metric, samples):
+    """Cumulative bucket, sum and count lines of a histogram stored as per-bucket counters."""
+    groups = {}
+    for (name, labels), value in samples.items():
+        if name == f'{metric}_bucket':
+            labels = dict(labels)
+            bucket = labels.pop('le')
+            groups.setdefault(tuple(labels.items()), {})[bucket] = value
+
+    lines = []
+    for labels in sorted(groups):
+        total = 0
+        for bound in [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']:
+            total += groups[labels].get(bound, 0)
+            lines.append(f'{metric}_bucket{_format_labels(labels + (("le", bound),))} {total}')
+        for suffix in ('sum', 'count'):
+            name = f'{metric}_{suffix}'
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(name, samples.get((name, labels), 0))}')
+    return lines
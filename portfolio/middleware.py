@@ -0,0 +1,36 @@
+from . import metrics
+
+# Requests not recorded: the scrape endpoint itself
+UNMEASURED_ROUTES = {'portfolio:metrics'}
+
+# Other methods are recorded as 'other', so clients cannot create new series
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL, template and external-call time for every request.
+
+    Staff users get the breakdown in a Server-Timing header. Streaming
+    responses are measured up to the point their headers are ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.collect_request() as request_metrics:
+            response = self.get_response(request)
+        duration = request_metrics.elapsed()
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else '<unmatched>'
+        if route in UNMEASURED_ROUTES:
+            return response
+        method = request.method if request.method in METHODS else 'other'
+        metrics.record_request(route, method, response.status_code, duration, request_metrics)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = request_metrics.server_timing(duration)
+        return response
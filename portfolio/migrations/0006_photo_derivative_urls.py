@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_photo_is_about_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='derivative_source',
+            field=models.CharField(blank=True, editable=False, help_text='Image and preset configuration the cached URLs were built from', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='derivative_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Cached Cloudinary URLs per transformation preset'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_photo_derivative_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+    ]
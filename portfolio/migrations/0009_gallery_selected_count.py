@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_selected_photos(apps, schema_editor):
+    Gallery = apps.get_model('portfolio', 'Gallery')
+    Selected = Gallery.selected_photos.through
+    counts = (
+        Selected.objects.filter(gallery_id=OuterRef('pk'))
+        .order_by().values('gallery_id').annotate(n=Count('id')).values('n')
+    )
+    Gallery.objects.update(selected_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_photo_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gallery',
+            name='selected_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of selected photos, kept in sync with selected_photos'),
+        ),
+        migrations.RunPython(count_selected_photos, migrations.RunPython.noop),
+    ]
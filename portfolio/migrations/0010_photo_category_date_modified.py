@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_upload_dates(apps, schema_editor):
+    Photo = apps.get_model('portfolio', 'Photo')
+    Photo.objects.update(date_modified=F('date_uploaded'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0009_gallery_selected_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_upload_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_photo_category_date_modified'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_about_photo', False), ('is_public', True)), fields=['-date_uploaded', '-id'], name='photo_public_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_about_photo', False), ('is_public', True)), fields=['category', '-date_uploaded', '-id'], name='photo_public_category_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_hero', True), ('is_public', True)), fields=['-date_uploaded'], name='photo_hero_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_featured', True), ('is_public', True)), fields=['-date_uploaded'], name='photo_featured_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_about_photo', True)), fields=['-date_uploaded'], name='photo_about_recent'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_photo_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='placeholder_failed',
+            field=models.BooleanField(default=False, editable=False, help_text='Rendering the placeholder failed; generate_placeholders skips it unless retrying'),
+        ),
+    ]
@@ -1,14 +1,29 @@
+import logging
+
 from django.db import models
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils.functional import cached_property
 from cloudinary.models import CloudinaryField
 
+from .derivatives import render_placeholder
+from .image_urls import RESPONSIVE_IMAGE_SLOTS, build_derivatives, build_preset_url, derivative_source, image_value
+from .metadata import extract_metadata
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields stored as NULL rather than '' when unknown
+METADATA_NULLABLE_FIELDS = {'width', 'height', 'aspect_ratio', 'aperture', 'iso', 'focal_length', 'date_taken'}
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=0)
+    date_modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -19,31 +34,186 @@ class Category(models.Model):
 
 
 class Photo(models.Model):
+    ORIENTATION_CHOICES = [
+        ('landscape', 'Landscape'),
+        ('portrait', 'Portrait'),
+        ('square', 'Square'),
+    ]
+
     title = models.CharField(max_length=200)
     image = CloudinaryField('image', folder='portfolio/photos')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='photos')
     description = models.TextField(blank=True)
     location = models.CharField(max_length=200, blank=True)
-    date_taken = models.DateField(null=True, blank=True)
+    date_taken = models.DateField(null=True, blank=True, db_index=True, help_text="Filled from EXIF when left empty")
     date_uploaded = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True, db_index=True)
     is_featured = models.BooleanField(default=False)
     is_hero = models.BooleanField(default=False, help_text="Display in hero carousel")
     is_about_photo = models.BooleanField(default=False, help_text="Use as Daniel's photo in About section")
     is_public = models.BooleanField(default=True)
 
+    # Extracted from the image at upload (see metadata.py)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    aspect_ratio = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    orientation = models.CharField(max_length=10, blank=True, editable=False, db_index=True, choices=ORIENTATION_CHOICES)
+    camera = models.CharField(max_length=100, blank=True)
+    lens = models.CharField(max_length=100, blank=True)
+    exposure_time = models.CharField(max_length=20, blank=True)
+    aperture = models.FloatField(null=True, blank=True)
+    iso = models.PositiveIntegerField(null=True, blank=True)
+    focal_length = models.FloatField(null=True, blank=True)
+
+    derivative_urls = models.JSONField(default=dict, blank=True, editable=False, help_text="Cached Cloudinary URLs per transformation preset")
+    derivative_source = models.CharField(max_length=255, blank=True, editable=False, help_text="Image and preset configuration the cached URLs were built from")
+    placeholder = models.TextField(blank=True, editable=False, help_text="Tiny inline preview shown while the image loads")
+    placeholder_failed = models.BooleanField(default=False, editable=False, help_text="Rendering the placeholder failed; generate_placeholders skips it unless retrying")
+
     class Meta:
         ordering = ['-date_uploaded']
+        # Partial indexes for the hot listings, each in the order it is read
+        # (QueryPlanTests in tests.py verifies they are used)
+        indexes = [
+            # Public catalog and sitemap (catalog.public_photos + keyset_page)
+            models.Index(
+                fields=['-date_uploaded', '-id'],
+                condition=models.Q(is_public=True, is_about_photo=False),
+                name='photo_public_recent',
+            ),
+            # Public catalog filtered by category
+            models.Index(
+                fields=['category', '-date_uploaded', '-id'],
+                condition=models.Q(is_public=True, is_about_photo=False),
+                name='photo_public_category_recent',
+            ),
+            # Home page hero carousel and featured grid
+            models.Index(fields=['-date_uploaded'], condition=models.Q(is_hero=True, is_public=True), name='photo_hero_recent'),
+            models.Index(fields=['-date_uploaded'], condition=models.Q(is_featured=True, is_public=True), name='photo_featured_recent'),
+            # About photo
+            models.Index(fields=['-date_uploaded'], condition=models.Q(is_about_photo=True), name='photo_about_recent'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        previous_value = self.derivative_source.partition(':')[2]
+        upload = self.image if isinstance(self.image, UploadedFile) else None
+        if upload:
+            # Read the upload itself before it is sent to Cloudinary
+            self._process_upload(upload)
+
+        super().save(*args, **kwargs)
+
+        # The image is uploaded during save, so derivatives are refreshed afterwards
+        fields = {}
+        if self.refresh_derivative_urls():
+            fields.update(derivative_urls=self.derivative_urls, derivative_source=self.derivative_source)
+        if not upload and previous_value and image_value(self.image) != previous_value:
+            # Replaced by an already uploaded image; `manage.py generate_placeholders`
+            # renders the new placeholder, so saving never waits for a download
+            if self.placeholder or self.placeholder_failed:
+                self.placeholder, self.placeholder_failed = '', False
+                fields.update(placeholder='', placeholder_failed=False)
+        if fields:
+            Photo.objects.filter(pk=self.pk).update(**fields)
+
+    def _process_upload(self, upload):
+        """Render the placeholder and extract metadata from an uploaded file"""
+        try:
+            upload.seek(0)
+            data = upload.read()
+            upload.seek(0)
+        except Exception as e:
+            logger.warning(f"Could not read upload for photo {self.pk}: {e}")
+            return
+
+        try:
+            self.placeholder = render_placeholder(data)
+            self.placeholder_failed = False
+        except Exception as e:
+            logger.warning(f"Could not render placeholder for photo {self.pk}: {e}")
+            self.placeholder = ''
+            self.placeholder_failed = True
+
+        try:
+            self.apply_metadata(extract_metadata(data))
+        except Exception as e:
+            logger.warning(f"Could not read metadata for photo {self.pk}: {e}")
+
+    def apply_metadata(self, metadata):
+        """
+        Copy extracted metadata onto the photo.
+
+        date_taken is only filled in when it is empty, so a date entered by
+        hand is never overwritten.
+
+        Returns:
+            List of changed field names
+        """
+        changed = []
+        for field, value in metadata.items():
+            if field == 'date_taken' and self.date_taken:
+                continue
+            if value is None and field not in METADATA_NULLABLE_FIELDS:
+                value = ''
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed.append(field)
+        return changed
+
+    def refresh_derivative_urls(self, force=False):
+        """
+        Rebuild the persisted derivative URLs if the image or presets changed.
+
+        Returns:
+            True if derivative_urls/derivative_source were updated
+        """
+        value = image_value(self.image)
+        source = derivative_source(value) if value else ''
+        if not force and source == self.derivative_source:
+            return False
+        local = (self.derivative_urls or {}).get('local')
+        self.derivative_urls = build_derivatives(value) if value else {}
+        if local and local.get('source') == value:
+            # Locally generated files (see derivatives.py) survive a preset change
+            self.derivative_urls['local'] = local
+        self.derivative_source = source
+        self.__dict__.pop('derivatives', None)
+        return True
+
+    @cached_property
+    def derivatives(self):
+        """Persisted derivative URLs, or freshly built (memoized) ones if they are stale"""
+        value = image_value(self.image)
+        if self.derivative_urls and value and self.derivative_source == derivative_source(value):
+            return self.derivative_urls
+        return build_derivatives(value) if value else {}
+
+    def get_preset_url(self, preset):
+        """Return the URL of a named preset from image_urls.IMAGE_PRESETS"""
+        url = self.derivatives.get('presets', {}).get(preset)
+        if url is None and self.image:
+            url = build_preset_url(image_value(self.image), preset)
+        return url
+
     def get_thumbnail_url(self):
         """Generate thumbnail URL using Cloudinary transformations"""
-        if self.image:
-            return self.image.build_url(transformation=[
-                {'width': 400, 'height': 400, 'crop': 'limit', 'quality': 'auto'}
-            ])
-        return None
+        return self.get_preset_url('thumbnail')
+
+    @property
+    def responsive_images(self):
+        """src/srcset/sizes for every slot in RESPONSIVE_IMAGE_SLOTS"""
+        if settings.IMAGE_DERIVATIVE_BACKEND == 'local' and 'local' in self.derivatives:
+            return self.derivatives['local']['slots']
+        return self.derivatives.get('slots', {})
+
+    def get_responsive_image(self, slot):
+        """Return the src/srcset/sizes dict for a layout slot, or None without an image"""
+        if slot not in RESPONSIVE_IMAGE_SLOTS:
+            raise ValueError(f"Unknown image slot: {slot}")
+        return self.responsive_images.get(slot)
 
 
 class ClientProfile(models.Model):
@@ -65,6 +235,7 @@ class Gallery(models.Model):
     client = models.ForeignKey(ClientProfile, on_delete=models.CASCADE, related_name='galleries')
     photos = models.ManyToManyField(Photo, related_name='galleries')
     selected_photos = models.ManyToManyField(Photo, related_name='selected_in_galleries', blank=True, help_text="Photos selected by client for final delivery")
+    selected_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of selected photos, kept in sync with selected_photos")
     cover_photo = models.ForeignKey(Photo, on_delete=models.SET_NULL, null=True, blank=True, related_name='cover_for_galleries')
     created_date = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
@@ -84,10 +255,7 @@ class Gallery(models.Model):
     def get_watermarked_url(self, photo):
         """Get photo URL with watermark overlay"""
         if photo.image:
-            return photo.image.build_url(transformation=[
-                {'overlay': 'text:Arial_40:Daniel%20Ahlberg', 'gravity': 'south_east', 'x': 20, 'y': 20, 'opacity': 60},
-                {'quality': 'auto', 'fetch_format': 'auto'}
-            ])
+            return photo.get_preset_url('watermarked')
         return None
 
 
@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Photo listings are ordered newest first on ``(date_uploaded, id)`` so that
+fetching any page costs a single indexed range query, no matter how deep
+into the catalog the visitor has scrolled. keyset_paginate does the same
+for any ordering, e.g. the photographer dashboard's sort options.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(photo):
+    """
+    Encode the position of a photo as an opaque, URL-safe cursor string.
+
+    Args:
+        photo: Photo instance (or any object with date_uploaded and id)
+
+    Returns:
+        Cursor string pointing just after the given photo
+    """
+    raw = f"{photo.date_uploaded.isoformat()}|{photo.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous page
+
+    Returns:
+        Tuple of (date_uploaded, id)
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(queryset, cursor=None, limit=24):
+    """
+    Return one page of a queryset ordered by (-date_uploaded, -id).
+
+    Args:
+        queryset: Photo queryset, already filtered
+        cursor: Cursor string from the previous page, or None for the first page
+        limit: Maximum number of rows to return
+
+    Returns:
+        Tuple of (list of rows, next cursor or None if this is the last page)
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    queryset = queryset.order_by('-date_uploaded', '-id')
+    if cursor:
+        date_uploaded, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date_uploaded__lt=date_uploaded) |
+            Q(date_uploaded=date_uploaded, id__lt=pk)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = list(queryset[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def keyset_paginate(queryset, ordering, cursor=None, limit=50):
+    """
+    Return one page of a queryset in an arbitrary keyset ordering.
+
+    Args:
+        queryset: queryset, already filtered and annotated
+        ordering: field or annotation names, '-' prefixed for descending;
+            the last one must be unique (usually 'id' or '-id')
+        cursor: cursor string from the previous page, or None for the first page
+        limit: maximum number of rows to return
+
+    Returns:
+        Tuple of (list of rows, next cursor or None if this is the last page)
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from e
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        # Decoded JSON may hold anything; convert each value the way its field
+        # would, so a tampered cursor fails here instead of in the database
+        try:
+            values = [_ordering_field(queryset, name).to_python(value) for (name, _), value in zip(fields, values)]
+        except (ValidationError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from e
+        if None in values:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+
+        # Rows after the cursor: equal on a prefix of the ordering, then past it on the next field
+        after = Q()
+        for i, (name, descending) in enumerate(fields):
+            step = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[i]})
+            for prev_name, prev_value in zip([f[0] for f in fields[:i]], values):
+                step &= Q(**{prev_name: prev_value})
+            after |= step
+        queryset = queryset.filter(after)
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    # Full-precision ISO timestamps; microseconds matter for equality
+    values = [getattr(rows[-1], name) for name, _ in fields]
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return rows, base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _ordering_field(queryset, name):
+    """The model field or annotation output field behind an ordering name."""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    model = queryset.model
+    *relations, last = name.split('__')
+    try:
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(last)
+    except (FieldDoesNotExist, AttributeError) as e:
+        raise ValueError(f"Unknown ordering field: {name}") from e
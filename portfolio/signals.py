@@ -0,0 +1,65 @@
+"""
+Signal handlers that keep cached portfolio data in sync with the database.
+"""
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .galleries import (
+    invalidate_all_galleries, invalidate_gallery_photos, invalidate_gallery_selection,
+    refresh_selected_counts,
+)
+from .models import Gallery, Photo, Category
+
+
+@receiver([post_save, post_delete], sender=Photo)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog(sender, **kwargs):
+    """Any change to a photo or category invalidates the cached catalog."""
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=Photo)
+def invalidate_gallery_manifests(sender, **kwargs):
+    """Gallery manifests embed photo URLs and titles, so a photo change invalidates them all."""
+    invalidate_all_galleries()
+
+
+@receiver(m2m_changed, sender=Gallery.photos.through)
+@receiver(m2m_changed, sender=Gallery.selected_photos.through)
+def invalidate_gallery_manifest(sender, instance, action, reverse, **kwargs):
+    """Drop the cached photo list or selection of galleries whose photos changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Changed from the photo side (photo.galleries.add(...)); possibly many galleries
+        invalidate_all_galleries()
+    elif sender is Gallery.photos.through:
+        invalidate_gallery_photos([instance.pk])
+    else:
+        invalidate_gallery_selection([instance.pk])
+
+
+@receiver(m2m_changed, sender=Gallery.selected_photos.through)
+def sync_selected_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Gallery.selected_count right when selections are edited through the ORM (e.g. in the admin)."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_selected_counts([instance.pk])
+    else:
+        # pk_set holds gallery ids here; it is None after photo.selected_in_galleries.clear()
+        refresh_selected_counts(pk_set)
+
+
+@receiver(pre_delete, sender=Photo)
+def remember_selecting_galleries(sender, instance, **kwargs):
+    """Note which galleries selected a photo; the cascade deletes the rows without m2m_changed."""
+    instance._selected_gallery_ids = list(instance.selected_in_galleries.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Photo)
+def recount_selecting_galleries(sender, instance, **kwargs):
+    gallery_ids = getattr(instance, '_selected_gallery_ids', None)
+    if gallery_ids:
+        refresh_selected_counts(gallery_ids)
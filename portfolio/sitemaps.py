@@ -1,6 +1,29 @@
+"""
+Sitemaps, pre-rendered and cached per catalog version.
+
+The sitemap sections are regular Django Sitemap classes; render_sitemaps()
+turns them into gzip-compressed XML files, and the files are cached under
+the catalog version, so they are rendered once per catalog change instead
+of on every crawler hit. When the sections hold more URLs than fit in one
+file, /sitemap.xml becomes a sitemap index pointing to one file per page.
+
+Photos have no pages of their own, so they are listed as image entries of
+the category page that shows them.
+"""
+import gzip
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.db.models import F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import render_to_string
 from django.urls import reverse
-from .models import Photo, Category
+
+from .caching import CacheNamespace
+from .catalog import CATALOG_VERSION_KEY, public_photos
+from .models import Category
+
+sitemap_cache = CacheNamespace('sitemaps', version_key=CATALOG_VERSION_KEY, timeout=settings.SITEMAP_CACHE_TIMEOUT)
 
 
 class StaticViewSitemap(Sitemap):
@@ -28,27 +51,116 @@ class CategorySitemap(Sitemap):
     priority = 0.6
 
     def items(self):
-        return Category.objects.all()
+        # Latest public upload per category, computed in the same query
+        categories = list(Category.objects.annotate(
+            latest_upload=Max(
+                'photos__date_uploaded', filter=Q(photos__is_public=True, photos__is_about_photo=False),
+            ),
+        ).order_by('order', 'name'))
+        images = category_images()
+        for category in categories:
+            category.sitemap_images = images.get(category.id, [])
+        return categories
 
     def lastmod(self, obj):
-        # Get the latest photo in this category
-        latest_photo = obj.photos.filter(is_public=True).first()
-        return latest_photo.date_uploaded if latest_photo else None
+        return obj.latest_upload
 
     def location(self, obj):
         return f"{reverse('portfolio:portfolio')}?category={obj.slug}"
 
+    def get_urls(self, page=1, site=None, protocol=None):
+        urls = super().get_urls(page=page, site=site, protocol=protocol)
+        for url in urls:
+            url['images'] = url['item'].sitemap_images
+        return urls
 
-class PhotoSitemap(Sitemap):
-    changefreq = 'monthly'
-    priority = 0.4
 
-    def items(self):
-        return Photo.objects.filter(is_public=True, is_featured=True)
+def category_images():
+    """
+    Image URLs of the newest public photos of every category, in one query.
 
-    def lastmod(self, obj):
-        return obj.date_uploaded
+    Returns:
+        Dict mapping category id to at most SITEMAP_IMAGES_PER_URL original
+        image URLs, newest first
+    """
+    photos = public_photos().select_related(None).only(
+        'id', 'category', 'image', 'derivative_urls', 'derivative_source', 'date_uploaded',
+    ).annotate(position=Window(
+        RowNumber(),
+        partition_by=[F('category')],
+        order_by=[F('date_uploaded').desc(), F('id').desc()],
+    )).filter(position__lte=settings.SITEMAP_IMAGES_PER_URL).order_by('category', 'position')
 
-    def location(self, obj):
-        # Since we don't have individual photo pages, link to portfolio with category
-        return f"{reverse('portfolio:portfolio')}?category={obj.category.slug}"
\ No newline at end of file
+    images = {}
+    for photo in photos:
+        images.setdefault(photo.category_id, []).append(photo.get_preset_url('original'))
+    return images
+
+
+SITEMAPS = {
+    'static': StaticViewSitemap,
+    'categories': CategorySitemap,
+}
+
+
+def render_sitemaps(site, protocol):
+    """
+    Render every sitemap file.
+
+    Args:
+        site: Site (or RequestSite) the URLs are built for
+        protocol: 'http' or 'https'
+
+    Returns:
+        Dict mapping file name ('sitemap.xml' and, when the URLs do not fit
+        in one file, 'sitemap-<section>-<page>.xml') to gzip-compressed XML
+    """
+    pages = {}
+    for section, sitemap_class in SITEMAPS.items():
+        sitemap = sitemap_class()
+        for page in sitemap.paginator.page_range:
+            pages[f'sitemap-{section}-{page}.xml'] = sitemap.get_urls(page=page, site=site, protocol=protocol)
+
+    if sum(len(urls) for urls in pages.values()) <= settings.SITEMAP_MAX_URLS:
+        urlset = [url for urls in pages.values() for url in urls]
+        return {'sitemap.xml': _compress(render_to_string('seo/sitemap.xml', {'urlset': urlset}))}
+
+    files = {}
+    index = []
+    for name, urls in pages.items():
+        files[name] = _compress(render_to_string('seo/sitemap.xml', {'urlset': urls}))
+        lastmods = [url['lastmod'] for url in urls if url['lastmod']]
+        index.append({
+            'location': f'{protocol}://{site.domain}{reverse("sitemap_section", args=[name])}',
+            'lastmod': max(lastmods) if lastmods else None,
+        })
+    files['sitemap.xml'] = _compress(render_to_string('seo/sitemap_index.xml', {'sitemaps': index}))
+    return files
+
+
+def _compress(content):
+    # mtime=0 keeps the output identical for identical content
+    return gzip.compress(content.encode('utf-8'), mtime=0)
+
+
+def get_sitemap_file(name, site, protocol):
+    """
+    Return a gzip-compressed sitemap file, rendering all of them on a cache miss.
+
+    Returns:
+        Compressed bytes, or None if there is no such file
+    """
+    names_key = sitemap_cache.key('names', site.domain, protocol)
+    names = sitemap_cache.get(names_key)
+    if names is not None and name not in names:
+        return None
+
+    key = sitemap_cache.key('file', site.domain, protocol, name)
+    content = sitemap_cache.get(key)
+    if content is None:
+        files = render_sitemaps(site, protocol)
+        for file_name, file_content in files.items():
+            sitemap_cache.set(sitemap_cache.key('file', site.domain, protocol, file_name), file_content)
+        sitemap_cache.set(names_key, sorted(files))
+        content = files.get(name)
+    return content
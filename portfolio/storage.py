@@ -0,0 +1,62 @@
+"""
+Google Cloud Storage backend for media files.
+
+Object parameters are chosen per file: only image derivatives, whose names
+change whenever the image does, are marked as cacheable forever. Uploads
+and download archives keep the bucket's default caching.
+
+It also offers what the gallery downloads need beyond the Storage API:
+chunked uploads that never hold a whole file, server-side renames and
+short-lived signed URLs for private files.
+"""
+from django.conf import settings
+from storages.backends.gcloud import GoogleCloudStorage
+from storages.utils import clean_name
+
+from .derivatives import DERIVATIVE_ROOT
+
+# Size of each chunk of a streamed upload; a multiple of 256 KiB as GCS requires
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class MediaStorage(GoogleCloudStorage):
+    def get_object_parameters(self, name):
+        parameters = super().get_object_parameters(name)
+        if name.startswith(f"{DERIVATIVE_ROOT}/"):
+            parameters['cache_control'] = settings.IMAGE_DERIVATIVE_CACHE_CONTROL
+        return parameters
+
+    def _blob(self, name):
+        return self.bucket.blob(self._normalize_name(clean_name(name)))
+
+    def open_upload(self, name, content_type=None):
+        """
+        Open a file object that uploads what is written to it in chunks.
+
+        The object is created when the file is closed.
+        """
+        options = {'content_type': content_type} if content_type else {}
+        return self._blob(name).open('wb', chunk_size=UPLOAD_CHUNK_SIZE, ignore_flush=True, **options)
+
+    def move(self, old_name, new_name):
+        """Rename an object inside the bucket, without downloading it."""
+        self.bucket.rename_blob(self._blob(old_name), self._normalize_name(clean_name(new_name)))
+
+    def signed_url(self, name, expiration, response_disposition=None):
+        """
+        A V4 signed URL for a file, whatever the bucket's access settings.
+
+        Args:
+            name: file name
+            expiration: timedelta the URL stays valid for
+            response_disposition: optional Content-Disposition for the download
+        """
+        parameters = {
+            'expiration': expiration,
+            'version': 'v4',
+            'bucket_bound_hostname': self.custom_endpoint,
+            'response_disposition': response_disposition,
+        }
+        if self.iam_sign_blob:
+            parameters['service_account_email'], parameters['access_token'] = self._get_iam_sign_blob_params()
+        return self._blob(name).generate_signed_url(**{key: value for key, value in parameters.items() if value})
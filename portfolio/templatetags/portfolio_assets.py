@@ -0,0 +1,50 @@
+"""
+Template tags for built static assets (see assets.py).
+
+Usage:
+    {% load portfolio_assets %}
+    <link rel="icon" href="{% asset 'images/logo.png' 'favicon-32' %}">
+    {% stylesheet 'css/style.css' critical='home' %}
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from portfolio.assets import get_asset_map, get_critical_css
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name, variant=''):
+    """Return the URL of the built version of a static file (or of a variant of it), else of the file itself."""
+    files = get_asset_map().get('files', {})
+    name = files.get(f'{name}@{variant}' if variant else name, name)
+    try:
+        return static(name)
+    except ValueError:
+        # Not collected, so not in the manifest; link it unhashed rather than fail the page
+        return f'{settings.STATIC_URL}{name}'
+
+
+
+@register.simple_tag
+def stylesheet(name, critical=None):
+    """
+    Render a stylesheet link.
+
+    With critical='<page>' and critical CSS built for that page, the critical
+    rules are inlined and the full stylesheet loads without blocking rendering.
+    """
+    href = asset(name)
+    css = get_critical_css(critical) if critical else ''
+    if not css:
+        return format_html('<link rel="stylesheet" href="{}">', href)
+    return format_html(
+        '<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '    <noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(css.replace('</', '<\\/')), href, href,
+    )
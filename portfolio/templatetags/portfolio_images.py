@@ -0,0 +1,30 @@
+"""
+Template tags for rendering responsive photo images.
+
+Usage:
+    {% load portfolio_images %}
+    <img {% responsive_image_attrs photo 'grid-large-landscape' %} alt="{{ photo.title }}">
+"""
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image_attrs(photo, slot):
+    """Render src, srcset and sizes attributes for a photo in the given layout slot."""
+    image = photo.get_responsive_image(slot) if photo else None
+    if not image:
+        return ''
+    return format_html(
+        'src="{}" srcset="{}" sizes="{}"',
+        image['src'], image['srcset'], image['sizes'],
+    )
+
+
+@register.simple_tag
+def responsive_image_url(photo, slot):
+    """Return the fallback URL for a photo in the given layout slot."""
+    image = photo.get_responsive_image(slot) if photo else None
+    return image['src'] if image else ''
@@ -3,6 +3,7 @@ from . import views
 from . import views_seo
 from . import views_verification
 from . import firebase_views
+from . import views_media
 
 app_name = 'portfolio'
 
@@ -26,9 +27,17 @@ urlpatterns = [
     # Gallery URLs
     path('gallery/', views.client_gallery, name='client_gallery'),
     path('gallery/<slug:slug>/', views.gallery_detail, name='gallery_detail'),
+    path('gallery/<slug:slug>/download/', views.download_selection, name='download_selection'),
     path('api/filter-photos/', views.filter_photos, name='filter_photos'),
+    path('api/portfolio-photos/', views.portfolio_photos, name='portfolio_photos'),
     path('dashboard/', views.photographer_dashboard, name='photographer_dashboard'),
+    path('dashboard/cache/', views.cache_stats, name='cache_stats'),
+    path('metrics', views.metrics, name='metrics'),
     path('gallery/<int:gallery_id>/photo/<int:photo_id>/toggle/', views.toggle_photo_selection, name='toggle_photo_selection'),
+    path('gallery/<int:gallery_id>/selection/', views.update_photo_selection, name='update_photo_selection'),
+
+    # Locally generated image derivatives (MEDIA_ROOT storage)
+    path('media/derivatives/<path:path>', views_media.serve_derivative, name='derivative'),
 
     # SEO files
     path('robots.txt', views_seo.robots_txt, name='robots_txt'),
@@ -2,13 +2,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_POST, require_GET, require_http_methods
 from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.template.loader import render_to_string
 from .models import Photo, Category, Gallery, ClientProfile
 from .forms import ContactForm, ClientLoginForm, GalleryPasswordForm
-
-
+from .pagination import keyset_page, keyset_paginate
+from .decorators import cache_public_page, catalog_condition
+from .galleries import DASHBOARD_SORTS, TOGGLE, apply_selection, client_galleries, dashboard_galleries, get_gallery_manifest
+from .caching import collect_stats, display_location, reset_stats, shared_cache
+from .catalog import PHOTO_FIELDS, catalog_cache, get_photo_page, public_photos
+from .downloads import DOWNLOAD_VARIANTS, selection_download_response
+from .metrics import render_prometheus
+import json
+
+
+@catalog_condition
+@cache_public_page
 def home(request):
     """Homepage with hero section and featured photos"""
     hero_photos = Photo.objects.filter(is_hero=True, is_public=True)[:5]
@@ -22,25 +35,89 @@ def home(request):
     return render(request, 'portfolio/home.html', context)
 
 
+@catalog_condition
+@cache_public_page
 def portfolio(request):
     """Public portfolio gallery with filtering"""
     categories = Category.objects.all()
     category_slug = request.GET.get('category')
 
-    photos = Photo.objects.filter(is_public=True, is_about_photo=False)
+    photos = public_photos()
 
     if category_slug:
         category = get_object_or_404(Category, slug=category_slug)
         photos = photos.filter(category=category)
 
+    # Only the first page is rendered; the grid loads the rest as you scroll
+    photos, next_cursor = keyset_page(photos, limit=settings.PORTFOLIO_PAGE_SIZE)
+
     context = {
         'photos': photos,
         'categories': categories,
         'current_category': category_slug,
+        'next_cursor': next_cursor,
     }
     return render(request, 'portfolio/portfolio.html', context)
 
 
+def _page_params(params):
+    """Parse category, cursor and a capped limit from request parameters."""
+    category_slug = params.get('category') or None
+    cursor = params.get('cursor') or None
+    limit = int(params.get('limit', settings.PORTFOLIO_PAGE_SIZE))
+    limit = max(1, min(limit, settings.PORTFOLIO_MAX_PAGE_SIZE))
+    return category_slug, cursor, limit
+
+
+@require_GET
+@catalog_condition
+def portfolio_photos(request):
+    """
+    Cursor-paginated page of public portfolio photos for the scrolling grid.
+
+    Query params:
+        category: optional category slug ('all' or empty for every category)
+        cursor: cursor returned by the previous page
+        limit: page size, capped at PORTFOLIO_MAX_PAGE_SIZE
+        format: 'html' (default) for rendered grid tiles, 'json' for photo data
+        fields: with format=json, comma-separated subset of catalog.PHOTO_FIELDS
+    """
+    if request.GET.get('format') == 'json':
+        return _photo_page_json(request.GET)
+
+    try:
+        category_slug, cursor, limit = _page_params(request.GET)
+        key = catalog_cache.key('tiles', category_slug or 'all', cursor or '', limit)
+        page = catalog_cache.get(key)
+        if page is None:
+            photos, next_cursor = keyset_page(public_photos(category_slug), cursor=cursor, limit=limit)
+            html = render_to_string('portfolio/partials/photo_tiles.html', {'photos': photos})
+            page = {'html': html, 'next_cursor': next_cursor}
+            catalog_cache.set(key, page)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+    return JsonResponse(page)
+
+
+def _photo_page_json(params):
+    """The JSON page of public photos served by portfolio_photos and filter_photos."""
+    try:
+        category_slug, cursor, limit = _page_params(params)
+        page = get_photo_page(category_slug, cursor, limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+    fields = [f for f in params.get('fields', '').split(',') if f in PHOTO_FIELDS]
+    photos = page['photos']
+    if fields:
+        photos = [{field: photo[field] for field in fields} for photo in photos]
+
+    return JsonResponse({'photos': photos, 'next_cursor': page['next_cursor']})
+
+
+@catalog_condition
+@cache_public_page
 def about(request):
     """About page"""
     about_photo = Photo.objects.filter(is_about_photo=True).first()
@@ -100,7 +177,7 @@ def client_gallery(request):
     """Client's private gallery dashboard"""
     try:
         client_profile = request.user.clientprofile
-        galleries = client_profile.galleries.filter(is_active=True)
+        galleries = client_galleries(client_profile)
     except ClientProfile.DoesNotExist:
         messages.error(request, 'No client profile found. Please contact the photographer.')
         return redirect('portfolio:home')
@@ -112,13 +189,32 @@ def client_gallery(request):
     return render(request, 'portfolio/client_gallery.html', context)
 
 
+# Session key holding the ids of password-protected galleries the client unlocked
+GALLERY_ACCESS_SESSION_KEY = 'gallery_access'
+
+
+def _has_gallery_access(request, gallery):
+    return (
+        gallery.id in request.session.get(GALLERY_ACCESS_SESSION_KEY, ()) or
+        # Grants stored before all galleries shared one session key
+        request.session.get(f'gallery_{gallery.id}_access', False)
+    )
+
+
+def _grant_gallery_access(request, gallery):
+    """Remember an unlocked gallery, writing the session only if it changes."""
+    granted = request.session.get(GALLERY_ACCESS_SESSION_KEY, [])
+    if gallery.id not in granted:
+        request.session[GALLERY_ACCESS_SESSION_KEY] = granted + [gallery.id]
+
+
 @login_required
 def gallery_detail(request, slug):
     """Individual gallery view for clients"""
-    gallery = get_object_or_404(Gallery, slug=slug, is_active=True)
+    gallery = get_object_or_404(Gallery.objects.select_related('client'), slug=slug, is_active=True)
 
     # Check if user has access to this gallery
-    if gallery.client.user != request.user:
+    if gallery.client.user_id != request.user.id:
         messages.error(request, 'You do not have access to this gallery.')
         return redirect('portfolio:client_gallery')
 
@@ -128,49 +224,61 @@ def gallery_detail(request, slug):
             form = GalleryPasswordForm(request.POST)
             if form.is_valid():
                 if form.cleaned_data['password'] == gallery.access_password:
-                    request.session[f'gallery_{gallery.id}_access'] = True
+                    _grant_gallery_access(request, gallery)
                 else:
                     messages.error(request, 'Incorrect password.')
                     return render(request, 'portfolio/gallery_password.html', {'form': form, 'gallery': gallery})
         else:
-            if not request.session.get(f'gallery_{gallery.id}_access'):
+            if not _has_gallery_access(request, gallery):
                 form = GalleryPasswordForm()
                 return render(request, 'portfolio/gallery_password.html', {'form': form, 'gallery': gallery})
 
-    photos = gallery.photos.all()
-    selected_photo_ids = list(gallery.selected_photos.values_list('id', flat=True))
-
     context = {
         'gallery': gallery,
-        'photos': photos,
-        'selected_photo_ids': selected_photo_ids,
+        'manifest': get_gallery_manifest(gallery.id),
     }
     return render(request, 'portfolio/gallery_detail.html', context)
 
 
-@require_POST
+@login_required
+@require_GET
+def download_selection(request, slug):
+    """
+    Download the photos a client selected in a gallery as a ZIP archive.
+
+    Query parameters:
+        variant: 'original' (default) or 'delivery'
+    """
+    gallery = get_object_or_404(Gallery.objects.select_related('client'), slug=slug, is_active=True)
+
+    # Same access rules as the gallery page
+    if gallery.client.user_id != request.user.id:
+        messages.error(request, 'You do not have access to this gallery.')
+        return redirect('portfolio:client_gallery')
+    if gallery.password_protected and not _has_gallery_access(request, gallery):
+        return redirect('portfolio:gallery_detail', slug=gallery.slug)
+
+    variant = request.GET.get('variant', 'original')
+    if variant not in DOWNLOAD_VARIANTS:
+        return HttpResponseBadRequest('Unknown variant')
+    if not gallery.selected_count:
+        messages.error(request, 'Select some photos before downloading.')
+        return redirect('portfolio:gallery_detail', slug=gallery.slug)
+
+    return selection_download_response(request, gallery, variant)
+
+
+@require_http_methods(["GET", "POST"])
+@catalog_condition
 def filter_photos(request):
-    """AJAX endpoint for filtering photos"""
-    category_slug = request.POST.get('category')
+    """
+    AJAX endpoint for filtering photos.
 
-    if category_slug and category_slug != 'all':
-        photos = Photo.objects.filter(category__slug=category_slug, is_public=True, is_about_photo=False)
-    else:
-        photos = Photo.objects.filter(is_public=True, is_about_photo=False)
-
-    photo_data = []
-    for photo in photos:
-        photo_data.append({
-            'id': photo.id,
-            'title': photo.title,
-            'image_url': photo.image.url,
-            'thumbnail_url': photo.thumbnail.url if photo.thumbnail else photo.image.url,
-            'category': photo.category.slug,
-            'description': photo.description,
-            'location': photo.location,
-        })
-
-    return JsonResponse({'photos': photo_data})
+    Kept for existing clients: it answers exactly like
+    portfolio_photos?format=json, with the parameters also accepted as form
+    data (category, cursor, limit, fields).
+    """
+    return _photo_page_json(request.POST if request.method == 'POST' else request.GET)
 
 # Photographer Dashboard Views
 @login_required
@@ -180,42 +288,141 @@ def photographer_dashboard(request):
         messages.error(request, 'Access denied. Staff only.')
         return redirect('portfolio:home')
     
-    galleries = Gallery.objects.all().select_related('client__user')
-    clients = ClientProfile.objects.all().select_related('user')
-    
+    search = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', 'newest')
+    if sort not in DASHBOARD_SORTS:
+        sort = 'newest'
+
+    try:
+        galleries, next_cursor = keyset_paginate(
+            dashboard_galleries(search),
+            DASHBOARD_SORTS[sort],
+            cursor=request.GET.get('cursor'),
+            limit=settings.DASHBOARD_PAGE_SIZE,
+        )
+    except ValueError:
+        messages.error(request, 'That page link is no longer valid.')
+        return redirect('portfolio:photographer_dashboard')
+
     context = {
         'galleries': galleries,
-        'clients': clients,
+        'next_cursor': next_cursor,
+        'search': search,
+        'sort': sort,
+        'is_first_page': not request.GET.get('cursor'),
     }
     return render(request, 'portfolio/photographer_dashboard.html', context)
 
 
+@login_required
+def cache_stats(request):
+    """Staff-only overview of cache hit ratio, key counts and memory per namespace"""
+    if not request.user.is_staff:
+        messages.error(request, 'Access denied. Staff only.')
+        return redirect('portfolio:home')
+
+    if request.method == 'POST' and 'reset' in request.POST:
+        reset_stats()
+        messages.success(request, 'Cache statistics have been reset.')
+        return redirect('portfolio:cache_stats')
+
+    context = {
+        'cache_backend': settings.CACHE_BACKEND,
+        'cache_location': display_location(),
+        'cache_shared': shared_cache(),
+        'namespaces': collect_stats(),
+    }
+    return render(request, 'portfolio/cache_stats.html', context)
+
+
+@require_GET
+def metrics(request):
+    """Request metrics of every worker in the Prometheus text format, for scrapers and staff"""
+    token = settings.METRICS_TOKEN
+    authorized = (
+        (token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')) or
+        (request.user.is_authenticated and request.user.is_staff)
+    )
+    if not authorized:
+        return HttpResponseForbidden('Metrics require a bearer token or a staff login')
+
+    response = HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _selection_gallery(request, gallery_id):
+    """Fetch a gallery for a selection change, or an error response if the user may not change it."""
+    try:
+        gallery = Gallery.objects.select_related('client').get(id=gallery_id)
+    except Gallery.DoesNotExist as e:
+        return None, JsonResponse({'error': str(e)}, status=404)
+
+    # Check if user is the gallery owner (client) or staff
+    if not (gallery.client.user_id == request.user.id or request.user.is_staff):
+        return None, JsonResponse({'error': 'Permission denied'}, status=403)
+    return gallery, None
+
+
 @login_required
 @require_POST
 def toggle_photo_selection(request, gallery_id, photo_id):
     """Toggle photo selection by client"""
+    gallery, error = _selection_gallery(request, gallery_id)
+    if error:
+        return error
+
+    # Decided under the gallery lock, so quick repeated clicks each flip the state
+    applied, total_selected = apply_selection(gallery, {photo_id: TOGGLE})
+    if photo_id not in applied:
+        return JsonResponse({'error': 'Photo matching query does not exist.'}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'selected': applied[photo_id],
+        'total_selected': total_selected
+    })
+
+
+@login_required
+@require_POST
+def update_photo_selection(request, gallery_id):
+    """
+    Apply a batch of select/unselect operations to a gallery.
+
+    Expected JSON body:
+    {
+        "operations": [{"photo": 12, "selected": true}, {"photo": 15, "selected": false}]
+    }
+
+    Later operations on the same photo win. Photos that are not part of the
+    gallery are ignored.
+
+    Returns:
+        JSON with the applied states by photo id and the new total
+    """
+    gallery, error = _selection_gallery(request, gallery_id)
+    if error:
+        return error
+
     try:
-        gallery = Gallery.objects.get(id=gallery_id)
-        
-        # Check if user is the gallery owner (client) or staff
-        if not (request.user == gallery.client.user or request.user.is_staff):
-            return JsonResponse({'error': 'Permission denied'}, status=403)
-        
-        photo = Photo.objects.get(id=photo_id)
-        
-        # Toggle selection
-        if gallery.selected_photos.filter(id=photo_id).exists():
-            gallery.selected_photos.remove(photo)
-            selected = False
-        else:
-            gallery.selected_photos.add(photo)
-            selected = True
-        
+        operations = json.loads(request.body)['operations']
+        changes = {}
+        for op in operations:
+            # Strings such as "false" would be truthy; only JSON booleans are accepted
+            if not isinstance(op['selected'], bool):
+                raise TypeError('selected must be true or false')
+            changes[int(op['photo'])] = op['selected']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid selection operations'}, status=400)
+    if len(changes) > settings.GALLERY_MAX_SELECTION_BATCH:
         return JsonResponse({
-            'success': True,
-            'selected': selected,
-            'total_selected': gallery.selected_photos.count()
-        })
-    
-    except (Gallery.DoesNotExist, Photo.DoesNotExist) as e:
-        return JsonResponse({'error': str(e)}, status=404)
+            'error': f'At most {settings.GALLERY_MAX_SELECTION_BATCH} photos per request'
+        }, status=400)
+
+    applied, total_selected = apply_selection(gallery, changes)
+    return JsonResponse({
+        'success': True,
+        'applied': applied,
+        'total_selected': total_selected,
+    })
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_GET
+
+from .derivatives import DERIVATIVE_ROOT, FORMATS
+
+
+@require_GET
+def serve_derivative(request, path):
+    """
+    Serve a locally generated image derivative from MEDIA_ROOT.
+
+    Derivative names are content-addressed, so responses are marked immutable.
+    """
+    extension = path.rsplit('.', 1)[-1]
+    if extension not in FORMATS:
+        raise Http404("Unknown derivative format")
+    try:
+        file = default_storage.open(f"{DERIVATIVE_ROOT}/{path}", 'rb')
+    except (FileNotFoundError, SuspiciousFileOperation):
+        raise Http404("Derivative not found")
+
+    response = FileResponse(file, content_type=FORMATS[extension][1])
+    response['Cache-Control'] = settings.IMAGE_DERIVATIVE_CACHE_CONTROL
+    return response
@@ -1,28 +1,57 @@
-from django.http import HttpResponse
+import gzip
+
+from django.contrib.sites.shortcuts import get_current_site
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.http import require_GET
 from django.template.loader import render_to_string
 
+from .decorators import precomputed_text
+from .sitemaps import get_sitemap_file
+
 
 @require_GET
+@precomputed_text('text/plain')
 def robots_txt(request):
     """Generate robots.txt file"""
-    content = render_to_string('seo/robots.txt', {
+    return render_to_string('seo/robots.txt', {
         'sitemap_url': request.build_absolute_uri('/sitemap.xml'),
     })
-    return HttpResponse(content, content_type='text/plain')
 
 
 @require_GET
+@precomputed_text('text/plain')
 def security_txt(request):
     """Generate security.txt file"""
-    content = render_to_string('seo/security.txt', {
+    return render_to_string('seo/security.txt', {
         'domain': request.get_host(),
     })
-    return HttpResponse(content, content_type='text/plain')
 
 
 @require_GET
+@precomputed_text('text/plain')
 def ads_txt(request):
     """Generate ads.txt file if needed"""
-    content = "# No ads currently running on this site\n"
-    return HttpResponse(content, content_type='text/plain')
\ No newline at end of file
+    return "# No ads currently running on this site\n"
+
+
+@require_GET
+def sitemap(request, name='sitemap.xml'):
+    """
+    Serve a pre-rendered sitemap file (the sitemap or sitemap index at /sitemap.xml).
+
+    Files are stored gzip-compressed and sent as-is to clients that accept
+    gzip, which includes every major crawler.
+    """
+    content = get_sitemap_file(name, get_current_site(request), request.scheme)
+    if content is None:
+        raise Http404('No such sitemap')
+
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(content, content_type='application/xml')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(content), content_type='application/xml')
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
@@ -1,33 +1,34 @@
-from django.http import HttpResponse
 from django.views.decorators.http import require_GET
 from django.conf import settings
 
+from .decorators import precomputed_text
+
 
 @require_GET
-def google_site_verification(request):
+@precomputed_text('text/plain')
+def google_site_verification(request, verification_code=None):
     """
     Google Search Console verification file
     Replace 'your-google-verification-code' with actual code from Google Search Console
     """
     verification_code = getattr(settings, 'GOOGLE_SITE_VERIFICATION', 'google-site-verification-placeholder')
-    content = f"google-site-verification: {verification_code}.html"
-    return HttpResponse(content, content_type='text/plain')
+    return f"google-site-verification: {verification_code}.html"
 
 
 @require_GET
+@precomputed_text('application/xml')
 def bing_site_verification(request):
     """
     Bing Webmaster Tools verification file
     Replace with actual verification code from Bing Webmaster Tools
     """
     verification_code = getattr(settings, 'BING_SITE_VERIFICATION', 'bing-site-verification-placeholder')
-    content = f'<?xml version="1.0"?>\n<users>\n    <user>{verification_code}</user>\n</users>'
-    return HttpResponse(content, content_type='application/xml')
+    return f'<?xml version="1.0"?>\n<users>\n    <user>{verification_code}</user>\n</users>'
 
 
 @require_GET
-def yandex_verification(request):
+@precomputed_text('text/html')
+def yandex_verification(request, verification_code=None):
     """Yandex verification file (optional for international SEO)"""
     verification_code = getattr(settings, 'YANDEX_VERIFICATION', 'yandex-verification-placeholder')
-    content = f'<html><head><meta name="yandex-verification" content="{verification_code}" /></head><body></body></html>'
-    return HttpResponse(content, content_type='text/html')
\ No newline at end of file
+    return f'<html><head><meta name="yandex-verification" content="{verification_code}" /></head><body></body></html>'
\ No newline at end of file
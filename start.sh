@@ -1,4 +1,6 @@
 #!/bin/bash
+python manage.py build_assets
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
 gunicorn photography_config.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
@@ -6,9 +6,11 @@ echo "Starting Django application..."
 # Run migrations
 echo "Running database migrations..."
 python manage.py migrate --noinput || echo "Migration failed but continuing..."
+python manage.py createcachetable || echo "Cache table creation failed but continuing..."
 
 # Collect static files
 echo "Collecting static files..."
+python manage.py build_assets || echo "Asset build failed but continuing..."
 python manage.py collectstatic --noinput || echo "Collectstatic failed but continuing..."
 
 # Start Gunicorn